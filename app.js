@@ -1,6 +1,9 @@
 const CONFIG = {
     tokenUrl: "https://maps.healthvermont.gov/arcgis/tokens/generateToken",
     serverUrl: "https://maps.healthvermont.gov/arcgis/rest/services/EnterpriseInventory/MapServer",
+    // Served by the token-checked data server (python -m enterprise_inventory.dataserver) behind the reverse proxy
+    relationshipIndexUrl: "data/RelationshipIndex.json",
+    snapshotManifestUrl: "data/InventorySnapshot.manifest.json",
     layers: {
         DATABASE_CONTENT: { id: 1, name: "Database Content" },
         APRX_REST_DATA:   { id: 2, name: "APRX REST Map Data" },
@@ -46,6 +49,10 @@ const AppState = {
     startTableIds: new Set(),
     initialTraceSelections: [], 
     discoveredRelationships: [], 
+    relationshipIndex: null,
+    snapshotManifest: null,
+    snapshotTableIds: new Set(),
+    searchIndex: null,
     networkInstance: null
 };
 let choicesInstances = { startTable: null, filters: {} };
@@ -94,7 +101,8 @@ async function handleLogin() {
     DOMElements.loginButton.querySelector('.spinner-border').classList.remove('d-none');
     DOMElements.loginError.classList.add('d-none');
     try {
-        const body = new URLSearchParams({ username, password, client: 'requestip', f: 'json' });
+        // Referer-bound, so the data server can check the token with the map service on the user's behalf
+        const body = new URLSearchParams({ username, password, client: 'referer', referer: window.location.origin, f: 'json' });
         const response = await fetch(CONFIG.tokenUrl, { method: 'POST', body });
         const data = await response.json();
         if (data.error) throw new Error(data.error.message || 'Authentication failed.');
@@ -113,7 +121,9 @@ async function handleLogin() {
 async function prefetchAllData() {
     DOMElements.resultsContainer.innerHTML = `<div class="d-flex align-items-center"><strong>Loading application data...</strong><div class="spinner-border ms-auto" role="status" aria-hidden="true"></div></div>`;
     try {
-        const fetchPromises = Object.entries(CONFIG.layers).map(async ([key, layerConfig]) => {
+        await loadInventorySnapshot();
+        const layersToQuery = Object.entries(CONFIG.layers).filter(([key]) => !AppState.allData.hasOwnProperty(key));
+        const fetchPromises = layersToQuery.map(async ([key, layerConfig]) => {
             try {
                 const metaUrl = `${CONFIG.serverUrl}/${layerConfig.id}?f=json&token=${AppState.token}`;
                 const metaResponse = await fetch(metaUrl);
@@ -143,6 +153,9 @@ async function prefetchAllData() {
             }
         });
         await Promise.all(fetchPromises);
+        AppState.relationshipIndex = await loadRelationshipIndex();
+        // Loaded in the background; the first search waits for it
+        AppState.searchIndex = loadSearchIndex();
         DOMElements.resultsContainer.innerHTML = `<div class="alert alert-info">Use the controls on the left to find a record and trace its relationships.</div>`;
         populateTableSelect();
         DOMElements.orphanReportButton.disabled = false;
@@ -151,6 +164,130 @@ async function prefetchAllData() {
         DOMElements.resultsContainer.innerHTML = `<div class="alert alert-danger"><strong>Error:</strong> Failed to initialize application data. Please check the console for details or try logging in again.</div>`;
     }
 }
+function fetchData(url, options = {}) {
+    // The snapshot and the indexes are only served with a token the map service accepts
+    return fetch(url, { ...options, headers: { 'X-Esri-Authorization': `Bearer ${AppState.token}` } });
+}
+async function fetchVersionedJson(file, hash, description) {
+    // The URL changes with the content hash, so the browser can cache each version indefinitely
+    const url = new URL(file, new URL(CONFIG.snapshotManifestUrl, window.location.href));
+    url.searchParams.set('v', hash);
+    const response = await fetchData(url);
+    if (!response.ok) throw new Error(`HTTP error ${response.status} for the ${description}`);
+    let bytes = new Uint8Array(await response.arrayBuffer());
+    if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+        const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        bytes = new Uint8Array(await new Response(stream).arrayBuffer());
+    }
+    return JSON.parse(new TextDecoder().decode(bytes));
+}
+async function loadInventorySnapshot() {
+    if (!CONFIG.snapshotManifestUrl) return;
+    try {
+        const manifestResponse = await fetchData(CONFIG.snapshotManifestUrl, { cache: 'no-cache' });
+        if (!manifestResponse.ok) throw new Error(`HTTP error ${manifestResponse.status} for the snapshot manifest`);
+        const manifest = await manifestResponse.json();
+        if (manifest.format !== 1) throw new Error(`Unsupported snapshot format ${manifest.format}`);
+        const snapshot = await fetchVersionedJson(manifest.file, manifest.hash, 'snapshot');
+        if (snapshot.hash !== manifest.hash) throw new Error('The snapshot does not match its manifest');
+        for (const [key, table] of Object.entries(snapshot.tables)) {
+            if (!CONFIG.layers[key]) continue;
+            const columns = table.columns.map(column => column.encoding === 'dictionary'
+                ? column.values.map(i => i === null ? null : snapshot.dictionary[i])
+                : column.values);
+            AppState.layerFields[key] = table.fields;
+            AppState.fieldAliases[key] = Object.fromEntries(table.fields.map(f => [f.name, f.alias]));
+            AppState.allData[key] = Array.from({ length: table.rowCount }, (_, row) =>
+                Object.fromEntries(table.fields.map((field, i) => [field.name, columns[i][row]])));
+            AppState.snapshotTableIds.add(key);
+        }
+        AppState.snapshotManifest = manifest;
+    } catch (error) {
+        console.warn("Inventory snapshot not available, querying the map service:", error);
+    }
+}
+async function loadSearchIndex() {
+    const manifest = AppState.snapshotManifest;
+    if (!manifest?.searchIndex) return null;
+    try {
+        const index = await fetchVersionedJson(manifest.searchIndex.file, manifest.searchIndex.hash, 'search index');
+        if (index.format !== 1) throw new Error(`Unsupported search index format ${index.format}`);
+        if (index.snapshotHash !== manifest.hash) throw new Error('The search index does not match the snapshot');
+        const tables = {};
+        for (const [tableId, table] of Object.entries(index.tables)) {
+            // Only tables loaded from the same snapshot and searched on the same fields can use the index
+            const fields = CONFIG.searchableFields[tableId];
+            if (!AppState.snapshotTableIds.has(tableId) || !fields || fields.join() !== table.fields.join()) continue;
+            tables[tableId] = {
+                grams: new Map(Object.entries(table.grams)),
+                recordsByOid: new Map(AppState.allData[tableId].map(record => [record.OBJECTID, record]))
+            };
+        }
+        return { gramLength: index.gramLength, tables };
+    } catch (error) {
+        console.warn("Search index not available, searching by scanning the tables:", error);
+        return null;
+    }
+}
+function indexedSearchCandidates(searchIndex, tableId, keywords) {
+    // Records holding every n-gram of every keyword long enough to have one, in OID order;
+    // null when the table has no index or no keyword is long enough, so it is scanned
+    const table = searchIndex?.tables[tableId];
+    if (!table) return null;
+    const grams = new Set();
+    for (const keyword of keywords) {
+        const chars = Array.from(keyword);
+        for (let i = 0; i + searchIndex.gramLength <= chars.length; i++) {
+            grams.add(chars.slice(i, i + searchIndex.gramLength).join(''));
+        }
+    }
+    if (grams.size === 0) return null;
+    const postings = [];
+    for (const gram of grams) {
+        const deltas = table.grams.get(gram);
+        if (!deltas) return [];
+        postings.push(deltas);
+    }
+    postings.sort((a, b) => a.length - b.length);
+    let oids = [];
+    let oid = 0;
+    for (const delta of postings[0]) oids.push(oid += delta);
+    for (const deltas of postings.slice(1)) {
+        const members = new Set();
+        oid = 0;
+        for (const delta of deltas) members.add(oid += delta);
+        oids = oids.filter(candidate => members.has(candidate));
+        if (oids.length === 0) break;
+    }
+    return oids.map(candidate => table.recordsByOid.get(candidate)).filter(record => record !== undefined);
+}
+async function loadRelationshipIndex() {
+    if (!CONFIG.relationshipIndexUrl) return null;
+    try {
+        const response = await fetchData(CONFIG.relationshipIndexUrl, { cache: 'no-cache' });
+        if (!response.ok) throw new Error(`HTTP error ${response.status} for the relationship index`);
+        const index = await response.json();
+        const matchesConfig = index.version === 1 && index.relationships.length === CONFIG.relationships.length &&
+            index.relationships.every((rel, i) => ['from', 'fromField', 'to', 'toField'].every(k => rel[k] === CONFIG.relationships[i][k]));
+        if (!matchesConfig) throw new Error('The relationship index does not match CONFIG.relationships');
+        const recordsByOid = {};
+        for (const [tableId, records] of Object.entries(AppState.allData)) {
+            recordsByOid[tableId] = new Map(records.map(record => [record.OBJECTID, record]));
+        }
+        return {
+            edges: index.edges.map(relEdges => new Map(Object.entries(relEdges))),
+            orphans: index.orphans,
+            recordsByOid
+        };
+    } catch (error) {
+        console.warn("Relationship index not available, tracing by scanning the tables:", error);
+        return null;
+    }
+}
+function lookupIndexedRecords(oids, tableId) {
+    const records = AppState.relationshipIndex.recordsByOid[tableId];
+    return records ? oids.map(oid => records.get(oid)).filter(record => record !== undefined) : [];
+}
 function togglePane() {
     const isCollapsed = DOMElements.mainLayout.classList.toggle('pane-collapsed');
     DOMElements.togglePaneBtn.innerHTML = isCollapsed ? '»' : '«';
@@ -220,10 +357,12 @@ function handleGlobalSearch() {
     const spinner = DOMElements.globalSearchButton.querySelector('.spinner-border');
     spinner.classList.remove('d-none');
     DOMElements.globalSearchButton.disabled = true;
-    setTimeout(() => {
+    setTimeout(async () => {
+        const searchIndex = await AppState.searchIndex;
         const found = [];
         for (const [tableId, allowedFields] of Object.entries(CONFIG.searchableFields)) {
-            const records = AppState.allData[tableId];
+            // The index narrows the records down; each candidate is still matched as in a scan
+            const records = indexedSearchCandidates(searchIndex, tableId, keywords) ?? AppState.allData[tableId];
             if (!records) continue;
             for (const record of records) {
                 for (const fieldName of allowedFields) {
@@ -540,6 +679,7 @@ function performTrace(initialSelections, activeRelationships) {
         activeRelationships.forEach(rel => {
             let sourceTable, sourceField, targetTable, targetField;
             let shouldTrace = false;
+            let isForward = true;
             if (rel.from === currentTableId) {
                 [sourceTable, sourceField, targetTable, targetField] = [rel.from, rel.fromField, rel.to, rel.toField];
                 shouldTrace = true;
@@ -547,6 +687,7 @@ function performTrace(initialSelections, activeRelationships) {
             else if (isBiDirectional && rel.to === currentTableId) {
                 [sourceTable, sourceField, targetTable, targetField] = [rel.to, rel.toField, rel.from, rel.fromField];
                 shouldTrace = true;
+                isForward = false;
             }
             if (shouldTrace) {
                 if (!allowLoopback && AppState.startTableIds.has(targetTable)) return;
@@ -555,8 +696,15 @@ function performTrace(initialSelections, activeRelationships) {
                     const linkKey = `${sourceTable}:${sourceField}:${val}->${targetTable}:${targetField}`;
                     if (processedLinks.has(linkKey)) return;
                     processedLinks.add(linkKey);
-                    const targetData = AppState.allData[targetTable] || [];
-                    const matches = targetData.filter(row => String(row[targetField]).toLowerCase() === String(val).toLowerCase());
+                    const relIndex = CONFIG.relationships.indexOf(rel);
+                    let matches;
+                    if (AppState.relationshipIndex && relIndex >= 0) {
+                        const edge = AppState.relationshipIndex.edges[relIndex].get(String(val).toLowerCase());
+                        matches = edge ? lookupIndexedRecords(isForward ? edge[1] : edge[0], targetTable) : [];
+                    } else {
+                        const targetData = AppState.allData[targetTable] || [];
+                        matches = targetData.filter(row => String(row[targetField]).toLowerCase() === String(val).toLowerCase());
+                    }
                     if (matches.length > 0) {
                         if (!foundRecordsByTable[targetTable]) foundRecordsByTable[targetTable] = [];
                         matches.forEach(match => {
@@ -647,6 +795,16 @@ async function generateOrphanReport() {
     }
 }
 function findOrphanRecords() {
+    if (AppState.relationshipIndex) {
+        const orphanResults = {};
+        for (const [tableId, oids] of Object.entries(AppState.relationshipIndex.orphans)) {
+            const orphansInThisTable = lookupIndexedRecords(oids, tableId);
+            if (orphansInThisTable.length > 0) {
+                orphanResults[tableId] = orphansInThisTable;
+            }
+        }
+        return orphanResults;
+    }
     const connectionEndpoints = new Map();
     for (const rel of CONFIG.relationships) {
         const processSide = (tableId, fieldName) => {
@@ -0,0 +1,666 @@
+"""
+Synthetic stand-ins for ArcGIS Online (arcgis.gis.GIS), ArcGIS Server
+(arcgis.gis.server.Server and the REST/Administrator endpoints reached through
+requests) and the arcpy calls the inventory makes, so the stages can be benchmarked
+offline on a plain Linux box.
+
+install(scale, latency) builds a deterministic synthetic environment and registers
+fake arcgis, arcpy and requests modules in sys.modules. It must run before any
+stage imports them. Worker processes inherit the fakes when they are forked (the
+default on Linux); spawned workers would import the real modules instead.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+import zipfile
+from datetime import timedelta
+
+# Synthetic environment size
+DEFAULT_SCALE = {
+    'items': 10000,               # ArcGIS Online items
+    'users': 200,                 # ArcGIS Online users (item owners)
+    'services': 2000,             # ArcGIS Server services, across all hosts
+    'hosts': 2,                   # ArcGIS Server sites
+    'folders': 10,                # folders per site
+    'databases': 15,              # enterprise geodatabase connection files
+    'datasets': 5000,             # tables and feature classes per geodatabase
+    'domains': 50,                # domains per geodatabase
+    'projects': 200,              # ArcGIS Pro projects
+    'layers_per_project': 25,
+    'legacy_project_fraction': 0.1,  # projects without CIM JSON, read through arcpy.mp
+    'seed': 1,
+}
+
+# Simulated latency in seconds per call
+DEFAULT_LATENCY = {
+    'http': 0.0,    # every AGO API call and every REST/admin request
+    'arcpy': 0.0,   # every geodatabase or project call (Describe, Walk, ListDomains, cursors, ...)
+}
+
+LATENCY = dict(DEFAULT_LATENCY)
+
+def _wait(kind):
+    seconds = LATENCY.get(kind)
+    if seconds:
+        time.sleep(seconds)
+
+# ---------------------------------------------------------------------------
+# ArcGIS Online
+# ---------------------------------------------------------------------------
+class FakeFolder:
+    def __init__(self, folder_id, title):
+        self.properties = {'id': folder_id, 'title': title}
+
+class FakeUser:
+    def __init__(self, username, folders, created):
+        self.username = username
+        self.created = created
+        self._folders = folders
+
+    @property
+    def folders(self):
+        _wait('http')
+        return list(self._folders)
+
+class FakeItem:
+    def __init__(self, item_id, item_type, title, owner, owner_folder, url, created, modified, data):
+        self.id = item_id
+        self.created = created
+        self.type = item_type
+        self.title = title
+        self.owner = owner
+        self.ownerFolder = owner_folder
+        self.url = url
+        self.modified = modified
+        self.homepage = f"https://bench.maps.arcgis.com/home/item.html?id={item_id}"
+        self._data = data
+
+    def get_data(self):
+        _wait('http')
+        return json.loads(self._data) if self._data else {}
+
+# Portal searches only page through the first 10,000 results of a query
+SEARCH_WINDOW = 10000
+_CREATED_RANGE = re.compile(r"created:\[(\d+) TO (\d+)\]")
+
+def _advanced_search(records, query, start, num):
+    """One page of a portal search over records (sorted by created), shaped like advanced_search's dictionary."""
+    _wait('http')
+    match = _CREATED_RANGE.search(query)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        records = [record for record in records if low <= record.created <= high]
+    page = records[start - 1:min(start - 1 + num, SEARCH_WINDOW)]
+    next_start = start + len(page) if start - 1 + len(page) < len(records) else -1
+    return {'query': query, 'total': len(records), 'start': start, 'num': len(page), 'nextStart': next_start, 'results': page}
+
+class FakeUsers:
+    def __init__(self, users):
+        self._users = users
+
+    def search(self, query=None, max_users=100, **kwargs):
+        _wait('http')
+        return list(self._users[:max_users])
+
+    def advanced_search(self, query, max_users=10, start=1, **kwargs):
+        return _advanced_search(self._users, query, start, max_users)
+
+    def get(self, username):
+        _wait('http')
+        return next((user for user in self._users if user.username == username), None)
+
+class FakeContent:
+    def __init__(self, items):
+        self._items = items
+        self._by_id = {item.id: item for item in items}
+
+    def search(self, query="", max_items=10, **kwargs):
+        _wait('http')
+        if not query:
+            return list(self._items[:max_items])
+        ids = re.findall(r"id:(\w+)", query)
+        return [self._by_id[item_id] for item_id in ids if item_id in self._by_id][:max_items]
+
+    def advanced_search(self, query, max_items=100, start=1, **kwargs):
+        return _advanced_search(self._items, query, start, max_items)
+
+    def get(self, item_id):
+        _wait('http')
+        return self._by_id.get(item_id)
+
+class FakeGIS:
+    def __init__(self, url=None, username=None, password=None, **kwargs):
+        environment = ENVIRONMENT['ago']
+        self.url = "https://bench.maps.arcgis.com"
+        self.properties = {'id': "BenchOrg"}
+        self.users = FakeUsers(environment['users'])
+        self.content = FakeContent(environment['items'])
+
+def _build_ago(scale, rng, service_urls):
+    users = []
+    folders_by_user = {}
+    for u in range(scale['users']):
+        folders = [FakeFolder(f"f{u}x{f}", f"Folder {f}") for f in range(rng.randint(0, 4))]
+        users.append(FakeUser(f"user{u}", folders, 1400000000000 + u * 86400000))
+        folders_by_user[f"user{u}"] = folders
+
+    items = []
+    service_items = []
+    web_map_items = []
+    for i in range(scale['items']):
+        owner = users[rng.randrange(len(users))].username
+        folders = folders_by_user[owner]
+        owner_folder = rng.choice(folders).properties['id'] if folders and rng.random() < 0.7 else None
+        item_id = f"{i:032x}"
+        roll = rng.random()
+        if roll < 0.40:
+            item_type, url, data = 'Feature Service', rng.choice(service_urls), None
+        elif roll < 0.70:
+            item_type, url = 'Web Map', None
+            layers = [{'title': f"Layer {n}", 'url': f"{rng.choice(service_urls)}/{n}"} for n in range(rng.randint(1, 12))]
+            if rng.random() < 0.3:
+                layers.append({'title': "Group", 'layerType': 'GroupLayer',
+                               'layers': [{'title': "Child", 'url': f"{rng.choice(service_urls)}/0"}]})
+            data = json.dumps({'operationalLayers': layers,
+                               'baseMap': {'baseMapLayers': [{'title': "Basemap", 'url': "https://basemaps.example/tile"}]}})
+        elif roll < 0.80:
+            item_type, url = 'Dashboard', None
+            references = service_items + web_map_items
+            # A few widgets point at items outside the organization, which only content.get can resolve
+            widgets = [{'dataSource': {'itemId': rng.choice(references).id if rng.random() < 0.9 else f"external{rng.randrange(10**6):026d}"}}
+                       for _ in range(rng.randint(0, 6))] if references else []
+            data = json.dumps({'widgets': widgets})
+        elif roll < 0.85:
+            item_type, url = 'Web Mapping Application', None
+            # Most apps use a web map from earlier in the content; the rest name any item, possibly a later web map
+            map_id = rng.choice(web_map_items).id if web_map_items and rng.random() < 0.8 else f"{rng.randrange(scale['items']):032x}"
+            data = json.dumps({'map': {'itemId': map_id}})
+        elif roll < 0.95:
+            item_type, url = 'Web Experience', None
+            data = json.dumps({'dataSources': {f"ds{n}": {'url': rng.choice(service_urls), 'label': f"Source {n}"}
+                                               for n in range(rng.randint(0, 4))}})
+        else:
+            item_type, url, data = 'PDF', None, None
+        item = FakeItem(item_id, item_type, f"Item {i}", owner, owner_folder, url, 1500000000000 + i * 3600000,
+                        1700000000000 + i, data)
+        items.append(item)
+        if item_type == 'Feature Service':
+            service_items.append(item)
+        elif item_type == 'Web Map':
+            web_map_items.append(item)
+    return {'users': users, 'items': items}
+
+# ---------------------------------------------------------------------------
+# ArcGIS Server: arcgis.gis.server.Server and the REST/admin endpoints
+# ---------------------------------------------------------------------------
+class FakeService:
+    def __init__(self, name, service_type, status):
+        self.properties = {'serviceName': name, 'type': service_type}
+        self._status = status
+
+    @property
+    def status(self):
+        _wait('http')
+        return {'realTimeState': self._status}
+
+class FakeServiceManager:
+    def __init__(self, site):
+        self._site = site
+        self.folders = list(site['folders'])
+
+    def list(self, folder=""):
+        _wait('http')
+        return [FakeService(name, service_type, status)
+                for name, service_type, status, layers in self._site['folders'].get(folder or '/', [])]
+
+class FakeServer:
+    def __init__(self, url=None, token_url=None, username=None, password=None, **kwargs):
+        self.services = FakeServiceManager(ENVIRONMENT['ags'][url.split('/arcgis')[0]])
+
+class FakeResponse:
+    def __init__(self, url, status_code, payload, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.headers = dict({'Content-Type': 'application/json'}, **(headers or {}))
+        self.elapsed = timedelta(seconds=LATENCY.get('http') or 0.0)
+        self._payload = payload
+
+    def json(self):
+        return json.loads(self.content)
+
+class FakeHTTPAdapter:
+    def __init__(self, pool_connections=10, pool_maxsize=10, **kwargs):
+        pass
+
+class FakeSession:
+    def __init__(self):
+        self.headers = {}
+        self.hooks = {'response': []}
+        self.verify = True
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, url, params=None, timeout=None, headers=None, **kwargs):
+        _wait('http')
+        status_code, payload = _route(url.split('?')[0])
+        response_headers = {}
+        # The first site sends ETags and honours If-None-Match; the others send no validators
+        if status_code == 200 and url.startswith(next(iter(ENVIRONMENT['ags']))) and '/rest/services/' in url:
+            response_headers['ETag'] = '"' + hashlib.md5(json.dumps(payload).encode('utf-8')).hexdigest() + '"'
+            if (headers or {}).get('If-None-Match') == response_headers['ETag']:
+                status_code, payload = 304, None
+        response = FakeResponse(url, status_code, payload, response_headers)
+        for hook in self.hooks['response']:
+            hook(response)
+        return response
+
+    post = get
+
+def _route(url):
+    """Answers one REST or Administrator API request from the synthetic sites."""
+    host, _, path = url.partition('/arcgis/')
+    site = ENVIRONMENT['ags'].get(host)
+    if site is None:
+        return 404, {}
+    if path == 'tokens/generateToken':
+        return 200, {'token': 'benchmark-token'}
+    if path == 'admin/services':
+        return 200, {'folders': [folder for folder in site['folders'] if folder != '/'], 'services': []}
+    if path.startswith('admin/services') and path.endswith('/report'):
+        folder = path[len('admin/services'):-len('/report')].strip('/') or '/'
+        return 200, {'reports': [{'serviceName': name, 'type': service_type, 'status': {'realTimeState': status}}
+                                 for name, service_type, status, layers in site['folders'].get(folder, [])]}
+    if path.startswith('rest/services/'):
+        service = site['rest'].get(path[len('rest/services/'):])
+        if service is not None:
+            return 200, service
+    return 404, {'error': {'code': 404}}
+
+def _build_ags(scale, rng):
+    sites = {}
+    service_urls = []
+    for h in range(scale['hosts']):
+        host = f"https://ags{h}.bench.local"
+        folders = {'/': []}
+        folders.update({f"Folder{f}": [] for f in range(scale['folders'])})
+        sites[host] = {'folders': folders, 'rest': {}}
+    hosts = list(sites)
+    for s in range(scale['services']):
+        site = sites[hosts[s % len(hosts)]]
+        folder = rng.choice(list(site['folders']))
+        service_type = 'MapServer' if rng.random() < 0.6 else 'FeatureServer'
+        status = 'STARTED' if rng.random() < 0.95 else 'STOPPED'
+        layers = [{'id': n, 'name': f"Layer {n}", 'type': 'Feature Layer'} for n in range(rng.randint(0, 15))]
+        name = f"Service{s}" if folder == '/' else f"{folder}/Service{s}"
+        site['folders'][folder].append((name if folder == '/' else f"Service{s}", service_type, status, layers))
+        site['rest'][f"{name}/{service_type}"] = {'layers': layers}
+        service_urls.append(f"{hosts[s % len(hosts)]}/arcgis/rest/services/{name}/{service_type}")
+    return sites, service_urls
+
+# ---------------------------------------------------------------------------
+# arcpy: geodatabases, inventory tables and projects
+# ---------------------------------------------------------------------------
+class _Description:
+    def __init__(self, **properties):
+        self.__dict__.update(properties)
+
+class FakeField:
+    def __init__(self, name, domain="", field_type='String', length=255, alias=None):
+        self.name = name
+        self.aliasName = alias or name
+        self.domain = domain
+        self.type = field_type
+        self.length = length
+
+class FakeDomain:
+    def __init__(self, name, coded_values):
+        self.name = name
+        self.domainType = 'CodedValue' if coded_values is not None else 'Range'
+        self.codedValues = coded_values or {}
+
+def _build_geodatabases(scale, rng, directory):
+    geodatabases = {}
+    for d in range(scale['databases']):
+        database = f"BENCH{d}_PROD.sde"
+        owner = f"BENCH{d}.DBO."
+        domains = [FakeDomain(f"dom{n}", {code: f"Value {code}" for code in range(rng.randint(2, 30))} if n % 4 else None)
+                   for n in range(scale['domains'])]
+        feature_datasets = {f"{owner}FDS{f}": {} for f in range(max(scale['datasets'] // 250, 1))}
+        root = {}
+        for n in range(scale['datasets']):
+            is_feature_class = rng.random() < 0.7
+            fields = [FakeField('OBJECTID')] + [FakeField(f"field{k}", f"dom{rng.randrange(len(domains))}" if rng.random() < 0.2 else "")
+                                                 for k in range(rng.randint(2, 20))]
+            dataset = ('FeatureClass' if is_feature_class else 'Table',
+                       rng.choice(['Point', 'Polyline', 'Polygon']) if is_feature_class else None, fields)
+            if is_feature_class and rng.random() < 0.2:
+                feature_datasets[rng.choice(list(feature_datasets))][f"{owner}FC{n}"] = dataset
+            else:
+                root[f"{owner}{'FC' if is_feature_class else 'T'}{n}"] = dataset
+        geodatabases[f"{directory}/{database}"] = {'server': f"SQLBENCH{d % 3}", 'domains': domains,
+                                                   'root': root, 'feature_datasets': feature_datasets}
+    return geodatabases
+
+def _split_geodatabase_path(path):
+    path = str(path).replace('\\', '/')
+    for connection, geodatabase in ENVIRONMENT['geodatabases'].items():
+        if path == connection or path.startswith(connection + '/'):
+            return geodatabase, [part for part in path[len(connection):].split('/') if part]
+    return None, None
+
+def _lookup_dataset(path):
+    geodatabase, parts = _split_geodatabase_path(path)
+    if geodatabase is None:
+        return None, None
+    if not parts:
+        return geodatabase, ('Workspace', None, [])
+    if len(parts) == 1:
+        if parts[0] in geodatabase['root']:
+            return geodatabase, geodatabase['root'][parts[0]]
+        if parts[0] in geodatabase['feature_datasets']:
+            return geodatabase, ('FeatureDataset', None, [])
+    if len(parts) == 2 and parts[0] in geodatabase['feature_datasets']:
+        return geodatabase, geodatabase['feature_datasets'][parts[0]].get(parts[1])
+    return geodatabase, None
+
+def Describe(path):
+    _wait('arcpy')
+    if path in TABLES:
+        schema = TABLES[path].get('schema') or {}
+        fields = [FakeField('OBJECTID', field_type='OID', length=None)] + [FakeField(name, "", *schema.get(name, ()))
+                                                                          for name in TABLES[path]['fields']]
+        return _Description(OIDFieldName='OBJECTID', dataType='Table', fields=fields)
+    geodatabase, dataset = _lookup_dataset(path)
+    if dataset is None:
+        raise OSError(f"Describe: {path} does not exist")
+    data_type, shape_type, fields = dataset
+    properties = {'dataType': data_type, 'shapeType': shape_type, 'fields': fields}
+    if data_type == 'Workspace':
+        properties['connectionProperties'] = _Description(server=geodatabase['server'])
+    return _Description(**properties)
+
+def Exists(path):
+    _wait('arcpy')
+    return path in TABLES or _lookup_dataset(path)[1] is not None
+
+def ListFields(path):
+    return Describe(path).fields
+
+def _walk(workspace, datatype=None, type=None):
+    _wait('arcpy')
+    geodatabase, parts = _split_geodatabase_path(workspace)
+    yield workspace, list(geodatabase['feature_datasets']), list(geodatabase['root'])
+    for name, datasets in geodatabase['feature_datasets'].items():
+        _wait('arcpy')
+        yield f"{workspace}/{name}", [], list(datasets)
+
+def _list_domains(workspace):
+    _wait('arcpy')
+    return list(_split_geodatabase_path(workspace)[0]['domains'])
+
+# Inventory tables: table path -> {'fields': [...], 'rows': {oid: row}, 'next': oid, 'schema': {field: (type, length, alias)}}
+TABLES = {}
+_tables_lock = threading.Lock()
+
+def create_tables(tables, schema):
+    """Creates the missing inventory tables with typed fields. tables maps table IDs to paths, schema is schema.INVENTORY_SCHEMA."""
+    for table_id, path in tables.items():
+        if path and path not in TABLES:
+            TABLES[path] = {'fields': [name for name, field_type, length, alias in schema[table_id]], 'rows': {}, 'next': 1,
+                            'schema': {name: (field_type, length, alias) for name, field_type, length, alias in schema[table_id]}}
+
+def _table(path, fields):
+    with _tables_lock:
+        table = TABLES.setdefault(path, {'fields': None, 'rows': {}, 'next': 1})
+        if table['fields'] is None:
+            table['fields'] = [field for field in fields if field not in ('OID@', 'OBJECTID')]
+        return table
+
+def _where_filter(where_clause):
+    if not where_clause:
+        return None
+    match = re.match(r"(\w+) IN \((.*)\)$", where_clause)
+    field, values = match.group(1), match.group(2)
+    wanted = {value.strip().strip("'").replace("''", "'") for value in re.findall(r"'(?:[^']|'')*'|[^,]+", values)}
+    return field, wanted
+
+class _Cursor:
+    def __init__(self, path, fields, where_clause=None, **kwargs):
+        _wait('arcpy')
+        self._table = _table(path, fields)
+        self._fields = list(fields)
+        self._filter = _where_filter(where_clause)
+        table_fields = self._table['fields']
+        self._indexes = [None if field in ('OID@', 'OBJECTID') else table_fields.index(field) for field in self._fields]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def _matches(self, oid, row):
+        if self._filter is None:
+            return True
+        field, wanted = self._filter
+        value = oid if field == 'OBJECTID' else row[self._table['fields'].index(field)]
+        return str(value) in wanted
+
+    def _values(self, oid, row):
+        return [oid if index is None else row[index] for index in self._indexes]
+
+    def _store(self, values):
+        table_fields = self._table['fields']
+        by_field = dict(zip(self._fields, values))
+        return tuple(None if by_field.get(field) is None else
+                     by_field[field] if isinstance(by_field[field], (int, float)) else str(by_field[field])
+                     for field in table_fields)
+
+class SearchCursor(_Cursor):
+    def __iter__(self):
+        for oid, row in list(self._table['rows'].items()):
+            if self._matches(oid, row):
+                yield tuple(self._values(oid, row))
+
+class UpdateCursor(_Cursor):
+    def __iter__(self):
+        for oid, row in list(self._table['rows'].items()):
+            if self._matches(oid, row):
+                self._current = oid
+                yield self._values(oid, row)
+
+    def updateRow(self, values):
+        self._table['rows'][self._current] = self._store(values)
+
+    def deleteRow(self):
+        del self._table['rows'][self._current]
+
+class InsertCursor(_Cursor):
+    def insertRow(self, values):
+        table = self._table
+        table['rows'][table['next']] = self._store(values)
+        table['next'] += 1
+
+def _numpy_array_to_table(array, path):
+    _wait('arcpy')
+    TABLES[path] = {'fields': list(array.dtype.names), 'rows': dict(enumerate(array.tolist(), 1)), 'next': len(array) + 1}
+
+def _append(inputs, target, schema_type="TEST"):
+    _wait('arcpy')
+    source = TABLES[inputs]
+    with InsertCursor(target, source['fields']) as insertCursor:
+        for row in source['rows'].values():
+            insertCursor.insertRow(row)
+
+def _delete(path):
+    TABLES.pop(path, None)
+
+class Editor:
+    def __init__(self, workspace):
+        self.workspace = workspace
+
+    def startEditing(self, with_undo=True, multiuser_mode=True):
+        _wait('arcpy')
+
+    def startOperation(self):
+        pass
+
+    def stopOperation(self):
+        pass
+
+    def abortOperation(self):
+        pass
+
+    def stopEditing(self, save_changes):
+        _wait('arcpy')
+
+# ArcGIS Pro projects
+class _FakeLayer:
+    def __init__(self, definition):
+        self.name = definition['name']
+        self.isGroupLayer = definition.get('group', False)
+        self._source = definition.get('source')
+
+    def supports(self, property_name):
+        return property_name == "DATASOURCE" and self._source is not None
+
+    @property
+    def dataSource(self):
+        return self._source
+
+class _FakeMap:
+    def __init__(self, definition):
+        self.name = definition['name']
+        self._layers = [_FakeLayer(layer) for layer in definition['layers']]
+
+    def listLayers(self):
+        return list(self._layers)
+
+class ArcGISProject:
+    def __init__(self, path):
+        _wait('arcpy')
+        with zipfile.ZipFile(path) as archive:
+            self._maps = [_FakeMap(definition) for definition in json.loads(archive.read('benchmark.json'))]
+
+    def listMaps(self):
+        return list(self._maps)
+
+def _build_projects(scale, rng, directory):
+    """Writes synthetic .aprx files: CIM JSON documents plus benchmark.json for the arcpy.mp stand-in."""
+    os.makedirs(directory, exist_ok=True)
+    for p in range(scale['projects']):
+        maps = []
+        documents = {}
+        for m in range(rng.randint(1, 3)):
+            layers = []
+            for n in range(scale['layers_per_project'] // 2 + rng.randint(0, scale['layers_per_project'])):
+                server, database, dataset = f"SQLBENCH{n % 3}", f"BENCH{n % 15}", f"BENCH{n % 15}.DBO.FC{n}"
+                layers.append({'name': f"Layer {n}", 'dataset': dataset, 'server': server, 'database': database,
+                               'source': f"Server={server},Database={database},Instance=sde:sqlserver:{server},"
+                                         f"User=gis,Version=sde.DEFAULT,Dataset={dataset}"})
+            maps.append({'name': f"Map {m}", 'layers': layers})
+            layer_uris = [f"CIMPATH=map{m}/layer{n}.json" for n in range(len(layers))]
+            documents[f"map{m}.json"] = {'type': 'CIMMap', 'name': f"Map {m}", 'uRI': f"CIMPATH=map{m}.json", 'layers': layer_uris}
+            for uri, layer in zip(layer_uris, layers):
+                documents[uri.split('=', 1)[1]] = {
+                    'type': 'CIMFeatureLayer', 'name': layer['name'], 'uRI': uri,
+                    'featureTable': {'dataConnection': {
+                        'workspaceFactory': 'SDE', 'dataset': layer['dataset'],
+                        'workspaceConnectionString': f"SERVER={layer['server']};INSTANCE=sde:sqlserver:{layer['server']};"
+                                                     f"DATABASE={layer['database']};VERSION=sde.DEFAULT"}}}
+        legacy = rng.random() < scale['legacy_project_fraction']
+        with zipfile.ZipFile(os.path.join(directory, f"Project{p}.aprx"), 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('benchmark.json', json.dumps(maps))
+            if not legacy:
+                for member, document in documents.items():
+                    archive.writestr(member, json.dumps(document))
+
+# ---------------------------------------------------------------------------
+# Installation
+# ---------------------------------------------------------------------------
+ENVIRONMENT = {}
+
+def install(scale=None, latency=None, directory=None):
+    """
+    Builds the synthetic environment and registers the fake arcgis, arcpy and requests
+    modules. Returns the environment: AGS host URLs, the geodatabase connection
+    directory and file names, and the project directory.
+    """
+    scale = dict(DEFAULT_SCALE, **(scale or {}))
+    LATENCY.clear()
+    LATENCY.update(DEFAULT_LATENCY, **(latency or {}))
+    rng = random.Random(scale['seed'])
+
+    sites, service_urls = _build_ags(scale, rng)
+    database_directory = f"{directory}/sde"
+    ENVIRONMENT.clear()
+    ENVIRONMENT.update({
+        'ags': sites,
+        'ago': _build_ago(scale, rng, service_urls),
+        'geodatabases': _build_geodatabases(scale, rng, database_directory),
+        'database_directory': database_directory,
+        'project_directory': f"{directory}/projects",
+    })
+    _build_projects(scale, rng, ENVIRONMENT['project_directory'])
+    TABLES.clear()
+
+    arcgis = types.ModuleType('arcgis')
+    gis = types.ModuleType('arcgis.gis')
+    server = types.ModuleType('arcgis.gis.server')
+    gis.GIS = FakeGIS
+    server.Server = FakeServer
+    arcgis.gis = gis
+    gis.server = server
+
+    arcpy = types.ModuleType('arcpy')
+    da = types.ModuleType('arcpy.da')
+    mp = types.ModuleType('arcpy.mp')
+    da.SearchCursor, da.UpdateCursor, da.InsertCursor, da.Editor = SearchCursor, UpdateCursor, InsertCursor, Editor
+    da.Walk, da.ListDomains = _walk, _list_domains
+    mp.ArcGISProject = ArcGISProject
+    management = types.ModuleType('arcpy.management')
+    management.Append, management.Delete = _append, _delete
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is not None:
+        # Bulk loads build NumPy arrays, so they are only offered when NumPy is installed (as it is with ArcGIS Pro)
+        da.NumPyArrayToTable = _numpy_array_to_table
+    arcpy.da, arcpy.mp, arcpy.management = da, mp, management
+    arcpy.Describe, arcpy.Exists, arcpy.ListFields = Describe, Exists, ListFields
+    arcpy.ExecuteError = type('ExecuteError', (Exception,), {})
+
+    requests = types.ModuleType('requests')
+    adapters = types.ModuleType('requests.adapters')
+    requests.Session = FakeSession
+    adapters.HTTPAdapter = FakeHTTPAdapter
+    requests.adapters = adapters
+
+    sys.modules.update({'arcgis': arcgis, 'arcgis.gis': gis, 'arcgis.gis.server': server,
+                        'arcpy': arcpy, 'arcpy.da': da, 'arcpy.mp': mp, 'arcpy.management': management,
+                        'requests': requests, 'requests.adapters': adapters})
+    return {
+        'ags_Base_URLs': list(sites),
+        'databaseFileDirectory': database_directory,
+        'databaseFileNames': [os.path.basename(path) for path in ENVIRONMENT['geodatabases']],
+        'restAprxDirectory': ENVIRONMENT['project_directory'],
+    }
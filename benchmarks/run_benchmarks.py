@@ -0,0 +1,191 @@
+"""
+Offline benchmark of the inventory stages against the synthetic environment in
+fakes.py: no ArcGIS Online, ArcGIS Server, SQL Server or arcpy licence needed.
+
+    python benchmarks/run_benchmarks.py --items 10000 --services 2000 --latency-ms 20
+
+Each stage is run with the same parameters the scheduler would pass, against
+in-memory inventory tables, and reported with its wall time, the number of table
+rows it reconciled, the resulting throughput and the peak Python memory it
+allocated. Use --runs 2 or more to measure incremental runs, where the AGO state
+file, the APRX manifest and the tables are already populated. With --writer sqlite
+the tables are written to a real SQLite database with the inventory schema instead
+of the in-memory arcpy stand-in.
+
+With --pipeline the stages are run the way the command line runs them, through
+scheduler.RunStages, so the overlap of the HTTP stages (ago, ags) with the arcpy
+stages is measured: each stage is reported with its own duration, and a 'pipeline'
+line gives the wall time of the whole run. Add --sequential to compare with the
+stages run one at a time.
+
+Peak memory is measured with tracemalloc in this process only; it does not include
+worker processes and slows allocation-heavy code down. Pass --no-memory for timings
+without it. Worker processes inherit the fakes by forking, so run this on Linux.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes
+
+STAGES = ('ago', 'ags', 'catalog', 'domains', 'content', 'aprx', 'relationships', 'snapshot')
+
+def _inventory_tables(args, directory):
+    """The inventory tables by web application table ID, in the database --writer selects."""
+    database = f"{directory}/Inventory.sqlite" if args.writer == 'sqlite' else f"{directory}/Inventory.sde"
+    return {'DATABASE_CONTENT': f"{database}/DatabaseInventory", 'APRX_REST_DATA': f"{database}/APRXInventory",
+            'AGS_DATA': f"{database}/ArcGISServerInventory", 'AGO_DATA': f"{database}/AGOInventory",
+            'DOMAIN_USAGE': f"{database}/DomainUsage", 'DOMAIN_TABLE': f"{database}/DomainInventory", 'PBI_DATA': None}
+
+def _stage_functions(args, environment, directory):
+    """The stages as name -> function(results), called the way scheduler._pipeline_stages calls them."""
+    from enterprise_inventory.ago import GetAGODataSources
+    from enterprise_inventory.ags import GetArcGISServerData
+    from enterprise_inventory.aprx import GetArcGISProRESTData
+    from enterprise_inventory.geodatabase import BuildGeodatabaseCatalog, GetDomainData, UpdateDatabaseContentTable
+    from enterprise_inventory.relationships import BuildRelationshipIndex
+    from enterprise_inventory.snapshot import ExportInventorySnapshot
+
+    tables = _inventory_tables(args, directory)
+    database_directory, database_names = environment['databaseFileDirectory'], environment['databaseFileNames']
+    return {
+        'ago': lambda results: GetAGODataSources("https://bench.maps.arcgis.com", tables['AGO_DATA'], "bench", "bench",
+                                                 args.ago_workers, f"{directory}/state/AGOState.json", 24,
+                                                 args.ago_expand_web_maps),
+        'ags': lambda results: GetArcGISServerData(tables['AGS_DATA'], environment['ags_Base_URLs'], "bench", "bench",
+                                                   args.ags_workers, 60, args.ags_bulk_reports, f"{directory}/state/AGSResponseCache.sqlite"),
+        'catalog': lambda results: BuildGeodatabaseCatalog(database_directory, database_names, args.database_workers),
+        'domains': lambda results: GetDomainData(tables['DOMAIN_TABLE'], database_directory, tables['DOMAIN_USAGE'],
+                                                 database_names, args.database_workers, results['catalog']),
+        'content': lambda results: UpdateDatabaseContentTable(tables['DATABASE_CONTENT'], database_names, database_directory,
+                                                              args.database_workers, results['catalog']),
+        'aprx': lambda results: GetArcGISProRESTData(environment['restAprxDirectory'], tables['APRX_REST_DATA'],
+                                                     f"{directory}/state/APRXManifest.json", args.aprx_workers),
+        'relationships': lambda results: BuildRelationshipIndex(tables, f"{directory}/state/RelationshipIndex.json"),
+        'snapshot': lambda results: ExportInventorySnapshot(tables, f"{directory}/state/InventorySnapshot.json.gz"),
+    }
+
+def _rows_reconciled(metrics):
+    """Table rows reconciled so far (inserted, updated, deleted or unchanged), from the run metrics."""
+    return sum(value for name, labels, value in metrics.snapshot()['counters'] if name == 'table_rows')
+
+def _run_pipeline(args, stage_functions, run_number):
+    """Runs the selected stages once through scheduler.RunStages and returns their measurements plus a 'pipeline' total."""
+    from enterprise_inventory import metrics
+    from enterprise_inventory.scheduler import RunStages, _pipeline_stages
+
+    stages = {name: stage[:-1] + (stage_functions[name],) for name, stage in _pipeline_stages().items() if name in stage_functions}
+    metrics.reset()
+    start = time.perf_counter()
+    report = RunStages(stages, args.stages, concurrent=not args.sequential)
+    seconds = time.perf_counter() - start
+    failed = [name for name, (status, stage_seconds, error) in report.items() if status != 'succeeded']
+    if failed:
+        raise RuntimeError(f"Stages did not succeed: {', '.join(failed)}")
+    measurements = [{'run': run_number, 'stage': name, 'seconds': round(stage_seconds, 3), 'rows': None,
+                     'rows_per_second': None, 'peak_memory_mib': None}
+                    for name, (status, stage_seconds, error) in report.items()]
+    rows = _rows_reconciled(metrics)
+    measurements.append({'run': run_number, 'stage': 'pipeline', 'seconds': round(seconds, 3), 'rows': rows,
+                         'rows_per_second': round(rows / seconds, 1) if rows and seconds else None, 'peak_memory_mib': None})
+    return measurements
+
+def run(args, environment, directory):
+    """Runs every stage once per run and returns a list of result dictionaries."""
+    from enterprise_inventory import metrics
+    from enterprise_inventory.schema import INVENTORY_SCHEMA
+    from enterprise_inventory.writer import create_sqlite_tables
+
+    if args.writer == 'sqlite':
+        create_sqlite_tables(_inventory_tables(args, directory))
+    else:
+        fakes.create_tables(_inventory_tables(args, directory), INVENTORY_SCHEMA)
+    stages = _stage_functions(args, environment, directory)
+    measurements = []
+    for run_number in range(1, args.runs + 1):
+        if args.pipeline:
+            measurements.extend(_run_pipeline(args, stages, run_number))
+            continue
+        results = {}
+        for name in STAGES:
+            # The catalog feeds domains and content, so it always runs when they do
+            if name not in args.stages and not (name == 'catalog' and {'domains', 'content'} & set(args.stages)):
+                continue
+            metrics.reset()
+            if args.memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            results[name] = stages[name](results)
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if args.memory else None
+            if args.memory:
+                tracemalloc.stop()
+            rows = _rows_reconciled(metrics)
+            measurements.append({'run': run_number, 'stage': name, 'seconds': round(seconds, 3), 'rows': rows,
+                                 'rows_per_second': round(rows / seconds, 1) if rows and seconds else None,
+                                 'peak_memory_mib': round(peak / 2**20, 1) if peak is not None else None})
+    return measurements
+
+def _print_measurements(measurements):
+    print(f"\n{'run':>3}  {'stage':<13} {'seconds':>9} {'rows':>9} {'rows/s':>10} {'peak MiB':>9}")
+    for m in measurements:
+        rows = f"{m['rows']:9d}" if m['rows'] is not None else f"{'':>9}"
+        rate = f"{m['rows_per_second']:10.0f}" if m['rows_per_second'] else f"{'':>10}"
+        peak = f"{m['peak_memory_mib']:9.1f}" if m['peak_memory_mib'] is not None else f"{'':>9}"
+        print(f"{m['run']:>3}  {m['stage']:<13} {m['seconds']:9.2f} {rows} {rate} {peak}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inventory stages against synthetic stand-ins.")
+    scale = parser.add_argument_group("scale")
+    for name, default in fakes.DEFAULT_SCALE.items():
+        if name == 'legacy_project_fraction':
+            scale.add_argument('--legacy-project-fraction', type=float, default=default,
+                               help="Share of projects without CIM JSON, read through arcpy.mp (default %(default)s).")
+        else:
+            scale.add_argument(f"--{name.replace('_', '-')}", type=int, default=default, help="(default %(default)s)")
+    latency = parser.add_argument_group("latency")
+    latency.add_argument('--latency-ms', type=float, default=0.0, help="Delay added to every HTTP request and AGO API call.")
+    latency.add_argument('--arcpy-latency-ms', type=float, default=0.0, help="Delay added to every geodatabase and project call.")
+    workers = parser.add_argument_group("workers")
+    workers.add_argument('--ago-workers', type=int, default=8)
+    workers.add_argument('--ags-workers', type=int, default=8, help="Workers per ArcGIS Server site.")
+    workers.add_argument('--ags-bulk-reports', action='store_true', help="Use the folder-level Administrator API reports.")
+    workers.add_argument('--database-workers', type=int, default=1)
+    workers.add_argument('--aprx-workers', type=int, default=1)
+    parser.add_argument('--ago-expand-web-maps', action='store_true', help="Expand the web maps that apps reference into their layers.")
+    parser.add_argument('--writer', choices=('arcpy', 'sqlite'), default='arcpy',
+                        help="Write the tables through the arcpy stand-in or to a local SQLite database (default %(default)s).")
+    parser.add_argument('--stage', dest='stages', action='append', choices=STAGES,
+                        help="Benchmark only this stage. Repeat to run several; all stages run by default.")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Run the stages through the scheduler (overlapping them) and report the run's wall time.")
+    parser.add_argument('--sequential', action='store_true', help="With --pipeline, run the stages one at a time.")
+    parser.add_argument('--runs', type=int, default=1, help="Number of consecutive runs; later runs are incremental.")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="Skip tracemalloc peak memory measurement.")
+    parser.add_argument('--json', metavar='PATH', help="Also write the measurements to PATH as JSON.")
+    args = parser.parse_args(argv)
+    args.stages = args.stages or list(STAGES)
+
+    with tempfile.TemporaryDirectory(prefix="enterprise_inventory_bench_") as directory:
+        start = time.perf_counter()
+        scale_values = {name: getattr(args, name) for name in fakes.DEFAULT_SCALE}
+        environment = fakes.install(scale_values, {'http': args.latency_ms / 1000, 'arcpy': args.arcpy_latency_ms / 1000}, directory)
+        print(f"Built the synthetic environment in {time.perf_counter() - start:.1f}s.")
+        measurements = run(args, environment, directory)
+
+    _print_measurements(measurements)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'scale': scale_values, 'writer': args.writer, 'latency_ms': {'http': args.latency_ms, 'arcpy': args.arcpy_latency_ms},
+                       'measurements': measurements}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""
+Enterprise Inventory: populates the inventory tables with enterprise geodatabase
+content and domains, ArcGIS Pro project layers, ArcGIS Server services and ArcGIS
+Online items, for cross-environment tracing in the web application.
+
+Organization parameters live in enterprise_inventory.config. arcpy and arcgis are
+imported only by the stages that use them.
+"""
@@ -0,0 +1,8 @@
+"""Run the Enterprise Inventory: python -m enterprise_inventory [--stage NAME ...] [--sequential]"""
+
+import sys
+
+from .scheduler import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,628 @@
+"""ArcGIS Online items and the data sources behind them. arcgis is imported on first use."""
+
+import json
+import threading
+import time
+from collections import Counter
+
+from . import metrics
+from .parallel import ordered_map
+from .state import load_json_state, save_json_state
+from .writer import apply_table_delta, intern_value
+
+# Change signature of an ArcGIS Online item for incremental sync
+def _ago_item_signature(item, item_folder):
+    """
+    Everything about an item that ends up in its inventory rows, apart from its data.
+    The modified timestamp covers edits to the item data; owner, folder, title, type and
+    URL are included because moving or renaming an item does not always update it.
+    """
+    return [item.modified, item.owner, item_folder, item.title, item.type, item.url]
+
+# Paged, concurrent enumeration of portal searches
+# A portal search returns at most this many results for one query however it is paged (start + num)
+PORTAL_SEARCH_WINDOW = 10000
+AGO_SEARCH_PAGE_SIZE = 100
+
+def _created_range_query(query, low, high):
+    """Restricts a search query to records created between two epoch millisecond timestamps, inclusive."""
+    return f"({query}) AND created:[{low:019d} TO {high:019d}]"
+
+def _search_partitions(search_page, query, window):
+    """
+    Yields (query, count) pairs that together cover every result of query, each small
+    enough to page through within the search window. Queries over the window are split
+    into halves by created date until each half fits, oldest first.
+    """
+    results, total = search_page(query, 1, 1)
+    if total <= window:
+        if total:
+            yield query, total
+        return
+
+    def _split(low, high):
+        partition = _created_range_query(query, low, high)
+        results, count = search_page(partition, 1, 1)
+        if count <= window or low >= high:
+            if count:
+                yield partition, count
+            return
+        middle = (low + high) // 2
+        yield from _split(low, middle)
+        yield from _split(middle + 1, high)
+
+    yield from _split(0, int(time.time() * 1000) + 86400000)
+
+def _paged_search(search_page, query, key, max_workers, page_size=AGO_SEARCH_PAGE_SIZE, window=PORTAL_SEARCH_WINDOW):
+    """
+    Yields every result of a portal search, with no fixed ceiling, as pages arrive.
+
+    search_page(query, start, num) returns (results, total) for one page, with start
+    counted from 1. Pages are fetched by up to max_workers threads and yielded in
+    order; searches larger than the portal's search window are partitioned by created
+    date (see _search_partitions). Results are deduplicated on key(result), since
+    records created while paging can shift later pages.
+
+    Once every page has been read, the number of distinct results is checked against
+    the total the portal reports, both at the start and now, and a RuntimeError is
+    raised if fewer were enumerated than the smaller of the two, so incomplete
+    enumerations are never taken as the full list.
+    """
+    initial_total = search_page(query, 1, 1)[1]
+    seen = set()
+
+    def _pages():
+        for partition, count in _search_partitions(search_page, query, window):
+            for start in range(1, min(count, window) + 1, page_size):
+                yield partition, start
+
+    for page in ordered_map(lambda task: search_page(task[0], task[1], page_size)[0], _pages(), max_workers):
+        for result in page:
+            result_key = key(result)
+            if result_key not in seen:
+                seen.add(result_key)
+                yield result
+
+    final_total = search_page(query, 1, 1)[1]
+    if len(seen) < min(initial_total, final_total):
+        raise RuntimeError(f"Search '{query}' enumerated {len(seen)} results but the portal reports "
+                           f"{min(initial_total, final_total)}")
+
+# Recursive parsing of data sources within maps and applications
+def _parse_layers_recursively(layer_list, parent_item_for_debug):
+    """Recursively parse layer structures to find all data sources."""
+    sources = []
+    if not layer_list or not isinstance(layer_list, list):
+        return sources
+    
+    for layer in layer_list:
+        if not isinstance(layer, dict):
+            print(f"  DEBUG: Item {parent_item_for_debug.id} has a malformed layer entry. Skipping.")
+            continue
+
+        layer_title = layer.get('title', '||UNTITLED LAYER||')
+        layer_url = layer.get('url', None)
+        
+        if layer.get('layerType') == 'GroupLayer' and 'layers' in layer:
+            sources.extend(_parse_layers_recursively(layer.get('layers', []), parent_item_for_debug))
+        elif 'featureCollection' in layer:
+            fc_layer_name = layer.get('title', '||UNTITLED FEATURE COLLECTION||')
+            sources.append((fc_layer_name, "||EMBEDDED FEATURE COLLECTION||"))
+        elif layer_url:
+            sources.append((layer_title, layer_url))
+    return sources
+
+# Run-scoped cache of ArcGIS Online item metadata
+class _AGOItemCache:
+    """
+    Caches ArcGIS Online items by ID for the duration of a run so each item ID is
+    looked up over the network at most once. The cache is filled from the content
+    enumeration as items arrive; IDs that are missing are fetched in batches with a
+    single search per batch, and anything the search does not return falls back to
+    gis.content.get.
+    Deleted or inaccessible items are cached as None so they are not requested again.
+
+    The cache is shared by the worker threads in GetAGODataSources, so lookups that
+    are already in flight on another thread are waited on rather than repeated.
+    """
+
+    def __init__(self, gis, items=(), batch_size=50):
+        self._gis = gis
+        self._batch_size = batch_size
+        self._items = {item.id: item for item in items}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def add(self, item):
+        """Cache an item that arrived from the content enumeration."""
+        with self._lock:
+            self._items[item.id] = item
+
+    def prefetch(self, item_ids):
+        """Fetch every ID in item_ids that is not cached yet, in batches."""
+        event = threading.Event()
+        with self._lock:
+            missing = [item_id for item_id in dict.fromkeys(item_ids)
+                       if item_id not in self._items and item_id not in self._pending]
+            in_flight = {self._pending[item_id] for item_id in item_ids if item_id in self._pending}
+            for item_id in missing:
+                self._pending[item_id] = event
+
+        fetched = {}
+        try:
+            for start in range(0, len(missing), self._batch_size):
+                batch = missing[start:start + self._batch_size]
+                try:
+                    query = " OR ".join(f"id:{item_id}" for item_id in batch)
+                    with metrics.timer('ago_api_call', call='content.search'):
+                        found_items = self._gis.content.search(query=query, max_items=len(batch))
+                    for found in found_items:
+                        fetched[found.id] = found
+                except Exception as e:
+                    print(f"  DEBUG: Batched item lookup failed, falling back to single lookups: {e}")
+
+                # Items outside the organization are not returned by search, so look those up directly
+                for item_id in batch:
+                    if item_id not in fetched:
+                        try:
+                            with metrics.timer('ago_api_call', call='content.get'):
+                                fetched[item_id] = self._gis.content.get(item_id)
+                        except Exception as e:
+                            print(f"  DEBUG: Could not look up item {item_id}: {e}")
+                            fetched[item_id] = None
+        finally:
+            with self._lock:
+                for item_id in missing:
+                    self._items[item_id] = fetched.get(item_id)
+                    del self._pending[item_id]
+            event.set()
+
+        for other_event in in_flight:
+            other_event.wait()
+
+    def get(self, item_id):
+        """Return the cached item for item_id, or None if it does not exist or is inaccessible."""
+        if item_id not in self._items:
+            self.prefetch([item_id])
+        return self._items.get(item_id)
+
+# Owner folder titles, resolved on demand and cached between runs
+def _folder_titles(folders_list):
+    """Folder ID -> title for a user's folders, from either shape the arcgis API returns them in."""
+    titles = {}
+    # Check the type of the first element to determine API behavior.
+    if folders_list and isinstance(folders_list[0], dict):
+        # --- Path for OLDER arcgis versions (returns list of dictionaries) ---
+        for folder in folders_list:
+            if 'id' in folder and 'title' in folder:
+                titles[folder['id']] = folder['title']
+    else:
+        # --- Path for NEWER arcgis versions (returns list/generator of Folder objects) ---
+        for folder in folders_list:
+            folderProperties = folder.properties
+            if 'id' in folderProperties and 'title' in folderProperties:
+                titles[folderProperties['id']] = folderProperties['title']
+    return titles
+
+class _AGOFolderCache:
+    """
+    Resolves folder titles for the owners that actually appear on items, one owner at
+    a time, the first time one of their items needs a folder title. Items in an owner's
+    root folder need no lookup at all.
+
+    Titles are kept between runs (see state) for ttl_seconds. An item whose folder is
+    not in a cached entry, such as a folder created since, refreshes its owner's entry
+    early. Like _AGOItemCache, the cache is shared by the worker threads, and a lookup
+    already in flight on another thread is waited on rather than repeated.
+    """
+
+    def __init__(self, gis, cached=None, ttl_seconds=0):
+        self._gis = gis
+        self._ttl_seconds = ttl_seconds
+        now = time.time()
+        self._owners = {owner: entry for owner, entry in (cached or {}).items()
+                        if now - entry.get('fetched', 0) < ttl_seconds}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def title(self, owner, folder_id):
+        """Title of the item folder folder_id of owner, or 'root' for items outside any folder."""
+        if not folder_id:
+            return 'root'
+        while True:
+            with self._lock:
+                entry = self._owners.get(owner)
+                if entry is not None and (folder_id in entry['folders'] or entry.get('refreshed')):
+                    return entry['folders'].get(folder_id, 'root')
+                event = self._pending.get(owner)
+                if event is None:
+                    event = self._pending[owner] = threading.Event()
+                    break
+            event.wait()
+
+        folders, fetched = {}, None
+        try:
+            with metrics.timer('ago_api_call', call='users.get'):
+                user = self._gis.users.get(owner)
+            # In newer versions, user.folders is a generator, which is not subscriptable.
+            # Convert it to a list to safely handle both generators (new API) and lists (old API).
+            if user is not None:
+                with metrics.timer('ago_api_call', call='user.folders'):
+                    folders = _folder_titles(list(user.folders))
+            fetched = time.time()
+            metrics.count('ago_folder_lookups')
+        except Exception as e:
+            print(f"  DEBUG: Could not look up the folders of {owner}: {e}")
+        finally:
+            with self._lock:
+                # refreshed marks a lookup made this run, so a folder missing from it is not looked up again;
+                # failed lookups (fetched is None) are not kept between runs
+                self._owners[owner] = {'fetched': fetched, 'folders': folders, 'refreshed': True}
+                del self._pending[owner]
+            event.set()
+        return folders.get(folder_id, 'root')
+
+    def state(self):
+        """The cached entries, for the state file."""
+        with self._lock:
+            return {owner: {'fetched': entry['fetched'], 'folders': entry['folders']}
+                    for owner, entry in self._owners.items() if entry['fetched'] is not None}
+
+# Layer sources of a web map or web scene
+def _web_map_sources(item):
+    """Fetches the data of a Web Map or Web Scene item and returns its layer sources as (name, URL)."""
+    found_sources = []
+    with metrics.timer('ago_api_call', call='get_data'):
+        data = item.get_data()
+    if data and isinstance(data, str):
+        try: data = json.loads(data)
+        except json.JSONDecodeError: data = None 
+    
+    if data and isinstance(data, dict):
+        op_layers = data.get('operationalLayers', [])
+        found_sources.extend(_parse_layers_recursively(op_layers, item))
+        
+        if item.type == 'Web Map':
+            baseMap = data.get('baseMap', {})
+            if isinstance(baseMap, dict):
+                basemap_layers = baseMap.get('baseMapLayers', [])
+                found_sources.extend(_parse_layers_recursively(basemap_layers, item))
+            else:
+                print(f"  DEBUG: Item {item.id} ({item.title}) has a non-dictionary 'baseMap'.")
+    return found_sources
+
+# Run-scoped memo of parsed web maps, for expanding the web maps that apps reference
+class _AGOWebMapCache:
+    """
+    Holds the layer sources of every web map looked at during a run, so each web map's
+    data is fetched and parsed at most once however many apps reference it, and whether
+    the map itself or an app referencing it comes up first.
+
+    A referenced map that is unchanged since the last run (its signature matches the
+    state file) takes its sources from its saved rows instead of its data. Entries are
+    (signature, sources), with sources None for items that are missing, inaccessible or
+    not web maps. Lookups already in flight on another worker thread are waited on.
+    """
+
+    def __init__(self, item_cache, item_signature, previous_state):
+        self._item_cache = item_cache
+        self._item_signature = item_signature
+        self._previous_state = previous_state
+        self._maps = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _memoized(self, map_id, compute):
+        while True:
+            with self._lock:
+                if map_id in self._maps:
+                    metrics.count('ago_web_maps', source='reused')
+                    return self._maps[map_id]
+                event = self._pending.get(map_id)
+                if event is None:
+                    event = self._pending[map_id] = threading.Event()
+                    break
+            # Another thread is parsing this map; if it fails, try again here
+            event.wait()
+        try:
+            entry = compute()
+            with self._lock:
+                self._maps[map_id] = entry
+            return entry
+        finally:
+            with self._lock:
+                del self._pending[map_id]
+            event.set()
+
+    def signature(self, map_id):
+        """The current signature of a referenced item, or None if it cannot be found. Does not fetch its data."""
+        map_item = self._item_cache.get(map_id)
+        return self._item_signature(map_item) if map_item else None
+
+    def parsed(self, item):
+        """The layer sources of a Web Map or Web Scene item being interrogated."""
+        def _parse():
+            metrics.count('ago_web_maps', source='parsed')
+            return self._item_signature(item), _web_map_sources(item)
+        return self._memoized(item.id, _parse)[1]
+
+    def referenced(self, map_id):
+        """(signature, layer sources) of a web map referenced by ID; sources is None if it is not an accessible web map."""
+        def _resolve():
+            map_item = self._item_cache.get(map_id)
+            if map_item is None or map_item.type not in ('Web Map', 'Web Scene'):
+                return (self._item_signature(map_item) if map_item else None), None
+            signature = self._item_signature(map_item)
+            previous = self._previous_state.get(map_id)
+            if previous and previous.get('signature') == signature:
+                metrics.count('ago_web_maps', source='state')
+                return signature, [(row[6], row[7]) for row in previous['rows'] if (row[6], row[7]) != ("N/A", "N/A")]
+            metrics.count('ago_web_maps', source='parsed')
+            return signature, _web_map_sources(map_item)
+        return self._memoized(map_id, _resolve)
+
+# Item types whose data references web maps and other items
+AGO_APP_TYPES = ('Web Mapping Application', 'Dashboard', 'StoryMap', 'Web Experience', 'Hub Site Application')
+
+# Interrogation of a single ArcGIS Online item
+def _interrogate_ago_item(item, item_cache, parent_url, item_folder, web_maps=None, expanded_maps=None, source_items=None):
+    """
+    Interrogates one ArcGIS Online item for its underlying data sources and returns
+    the inventory rows for it. Errors are contained to the item and returned as a
+    single error row, so the caller can run items serially or concurrently.
+
+    With web_maps (an _AGOWebMapCache), web maps are parsed through it, and the web maps
+    an app references are expanded into one "Referenced Web Map Layer" row per layer
+    source, after the "Referenced Web Map" row. The signature of every web map expanded
+    is recorded in expanded_maps as map ID -> signature, or None for a map that could not
+    be read, which leaves the app's other rows in place.
+
+    The IDs of the items whose titles and URLs dashboard widget rows are built from are
+    added to source_items, when given.
+    """
+    rows = []
+    try:
+        item_id, item_type, item_name, item_url, item_owner = item.id, intern_value(item.type), item.title, item.homepage, intern_value(item.owner)
+        item_folder = intern_value(item_folder)
+        found_sources = []
+
+        def _expand_web_map(map_id, record_always=False):
+            try:
+                signature, map_sources = web_maps.referenced(map_id)
+            except Exception as e:
+                # Keep the app's own rows; no signature is recorded, so the app is interrogated again on the next run
+                print(f"  DEBUG: Item {item.id} ({item.title}) references web map {map_id}, which could not be read: {e}")
+                expanded_maps[map_id] = None
+                return
+            if map_sources is not None or record_always:
+                expanded_maps[map_id] = signature
+            if map_sources is not None:
+                found_sources.extend((f"Referenced Web Map Layer: {layer_name}"[:255], layer_url)
+                                     for layer_name, layer_url in map_sources)
+            
+        # --- Logic for other service item types ---
+        service_types = ('Feature Service', 'Map Service', 'Image Service', 'Vector Tile Service', 'Scene Service', 'KML', 'WMS', 'WMTS')
+        if item_type in service_types and item.url:
+            found_sources.append((item_name, item.url))
+
+        elif item_type in ('Web Map', 'Web Scene'):
+            found_sources.extend(web_maps.parsed(item) if web_maps is not None else _web_map_sources(item))
+
+        elif item_type in AGO_APP_TYPES:
+            with metrics.timer('ago_api_call', call='get_data'):
+                data = item.get_data()
+            if data and isinstance(data, str):
+                try: data = json.loads(data)
+                except json.JSONDecodeError: data = None
+
+            if data and isinstance(data, dict):
+                map_ref = data.get('map')
+                if isinstance(map_ref, dict) and 'itemId' in map_ref:
+                    map_id = map_ref['itemId']
+                    found_sources.append((f"Referenced Web Map", f"{parent_url}/home/item.html?id={map_id}"))
+                    if web_maps is not None:
+                        # Recorded even when the map cannot be read, so the app is interrogated again once it can
+                        _expand_web_map(map_id, record_always=True)
+                
+                widgets = data.get('widgets', [])
+                if isinstance(widgets, list):
+                    # Resolve every widget data source item in one batched lookup
+                    item_cache.prefetch([widget['dataSource']['itemId'] for widget in widgets
+                                         if isinstance(widget, dict)
+                                         and isinstance(widget.get('dataSource'), dict)
+                                         and 'itemId' in widget['dataSource']])
+                    for widget in widgets:
+                        if not isinstance(widget, dict):
+                            print(f"  DEBUG: Item {item.id} ({item.title}) has a non-dictionary 'widget'.")
+                            continue
+                        
+                        ds = widget.get('dataSource', {})
+                        if isinstance(ds, dict) and 'itemId' in ds:
+                            ds_item_id = ds['itemId']
+                            ds_item = item_cache.get(ds_item_id)
+                            if source_items is not None:
+                                source_items.add(ds_item_id)
+                            ds_name = ds_item.title if ds_item else '||UNKNOWN ITEM||'
+                            ds_url = ds_item.url if ds_item and ds_item.url else f"{parent_url}/home/item.html?id={ds_item_id}"
+                            found_sources.append((f"Dashboard Source: {ds_name}", ds_url))
+                
+                dataSources = data.get('dataSources', {})
+                if isinstance(dataSources, dict):
+                    for ds_id, ds_content in dataSources.items():
+                        if not isinstance(ds_content, dict):
+                            print(f"  DEBUG: Item {item.id} ({item.title}) has a non-dictionary 'dataSource' content for key '{ds_id}'.")
+                            continue
+
+                        if 'url' in ds_content:
+                            ds_name = ds_content.get('label', ds_id)
+                            found_sources.append((f"Experience Source: {ds_name}", ds_content['url']))
+                        elif 'itemId' in ds_content:
+                            ds_item_id = ds_content['itemId']
+                            ds_url = f"{parent_url}/home/item.html?id={ds_item_id}"
+                            found_sources.append((f"Experience Source Item", ds_url))
+                            # Experiences reference their web maps as data sources
+                            if web_maps is not None:
+                                _expand_web_map(ds_item_id)
+
+        # --- Add collected data for the item to the comprehensive store ---
+        if not found_sources:
+            row = (item_id, item_type, item_name, item_url, item_owner, item_folder, "N/A", "N/A")
+            rows.append(row)
+        else:
+            for layer_name, layer_url in found_sources:
+                row = (item_id, item_type, item_name, item_url, item_owner, item_folder, layer_name, intern_value(layer_url) if layer_url else "||NO URL FOUND||")
+                rows.append(row)
+
+    except Exception as e:
+        error_message = f"Could not process item {item.id} ({item.title}): {str(e)}"
+        print(f"ERROR: {error_message}")
+        row = (item.id, item.type, item.title, item.homepage, item.owner, "ERROR", "PROCESSING ERROR", error_message[:255])
+        rows.append(row)
+
+    return rows
+
+# ArcGIS Online Function
+def GetAGODataSources(ago_url, agoInventoryTable, agoUsername, agoPassword, agoMaxWorkers=1, agoStateFile=None,
+                      agoFolderCacheHours=24, agoExpandWebMaps=False):
+    """
+    Connects to ArcGIS Online, inventories all items, and interrogates each item
+    for its underlying data sources. The results, including item details and the
+    data source name and URL, are written to SQL.
+
+    This function is compatible with multiple versions of the arcgis Python API by
+    converting the user.folders property (which may be a list or a generator)
+    to a list, and then inspecting its contents to determine the correct processing path.
+    Folder titles are only looked up for owners with items in a folder, as those items
+    come up, and are cached in the state file for agoFolderCacheHours (see _AGOFolderCache).
+
+    When agoMaxWorkers is greater than 1, item data is fetched and parsed by a bounded
+    pool of worker threads. Rows are streamed to the table writer in search order
+    either way, so the table contents are identical to a serial run.
+
+    Items are enumerated with a paged search of the organization (see _paged_search),
+    so there is no cap on their number, and are interrogated as their pages arrive. If fewer items are enumerated than the portal reports, the run
+    fails before any table rows are deleted.
+
+    When agoStateFile is set, each item's signature (modified timestamp, owner, folder,
+    title, type and URL) and extracted rows are persisted between runs. Only new or
+    changed items are interrogated; rows for unchanged items come from the state file
+    and items that have been deleted are dropped.
+
+    With agoExpandWebMaps, apps (Web Mapping Applications, Dashboards, Experiences, ...)
+    also get a row for every layer source of the web maps they reference, so an app can
+    be traced to its services without the LayerURL -> ItemURL hop. Web maps are parsed
+    through a run-wide memo (see _AGOWebMapCache), so each is fetched at most once, and
+    an app's state entry records the signatures of the maps it expanded: an app is
+    interrogated again when one of them changes.
+
+    Dashboard widget rows hold the titles and URLs of the items the widgets show, so an
+    app's state entry also records the signatures of those items, and the app is
+    interrogated again when one of them is renamed, repointed or removed.
+    """
+
+    from arcgis.gis import GIS
+
+    gis = GIS(ago_url, agoUsername, agoPassword)
+    parent_url = gis.url
+    org_query = f"orgid:{gis.properties['id']}"
+
+    def _search_items(query, start, num):
+        with metrics.timer('ago_api_call', call='content.advanced_search'):
+            result = gis.content.advanced_search(query=query, max_items=num, start=start, sort_field='created', sort_order='asc')
+        return result['results'], result['total']
+ 
+    # --- Main item processing loop ---
+    # Items are enumerated page by page and interrogated as they arrive
+    item_cache = _AGOItemCache(gis)
+    seen_item_ids = set()
+
+    def _enumerate_items():
+        for item in _paged_search(_search_items, org_query, lambda item: item.id, agoMaxWorkers):
+            item_cache.add(item)
+            seen_item_ids.add(item.id)
+            yield item
+
+    # --- Incremental sync: only new or changed items are interrogated ---
+    # Rows for items whose signature matches the state file are reused as-is, and items
+    # that no longer appear in the search are dropped simply by not carrying them forward.
+    saved_state = load_json_state(agoStateFile) if agoStateFile else {}
+    previous_state = saved_state.get('items', {})
+    current_state = {}
+    sync_counts = Counter()
+
+    # Folder titles are only looked up for owners whose items sit in a folder
+    folder_cache = _AGOFolderCache(gis, saved_state.get('folders'), agoFolderCacheHours * 3600)
+
+    def _item_signature(item):
+        return _ago_item_signature(item, folder_cache.title(item.owner, item.ownerFolder))
+
+    web_maps = _AGOWebMapCache(item_cache, _item_signature, previous_state) if agoExpandWebMaps else None
+
+    def _expansion_current(item, entry):
+        # Apps carry the signatures of the web maps they expanded, and only when expanding
+        if web_maps is None or item.type not in AGO_APP_TYPES:
+            return 'webMaps' not in entry
+        return 'webMaps' in entry and all(web_maps.signature(map_id) == map_signature
+                                          for map_id, map_signature in entry['webMaps'].items())
+
+    def _source_signature(item_id):
+        source_item = item_cache.get(item_id)
+        return _item_signature(source_item) if source_item else None
+
+    def _sources_current(item, entry):
+        # Apps carry the signatures of the items their widget rows name
+        if item.type not in AGO_APP_TYPES:
+            return True
+        if 'sourceItems' not in entry:
+            return False
+        item_cache.prefetch(list(entry['sourceItems']))
+        return all(_source_signature(item_id) == source_signature for item_id, source_signature in entry['sourceItems'].items())
+
+    def _process(item):
+        item_folder = folder_cache.title(item.owner, item.ownerFolder)
+        signature = _ago_item_signature(item, item_folder)
+        previous = previous_state.get(item.id)
+        if (previous and previous.get('signature') == signature and _expansion_current(item, previous)
+                and _sources_current(item, previous)):
+            return item.id, previous, False
+        expanded_maps = {}
+        source_items = set()
+        with metrics.timer('ago_item', record=f"{item.id} {item.type} ({item.title})"):
+            rows = _interrogate_ago_item(item, item_cache, parent_url, item_folder, web_maps, expanded_maps, source_items)
+        entry = {'signature': signature, 'rows': rows}
+        if web_maps is not None and item.type in AGO_APP_TYPES:
+            entry['webMaps'] = expanded_maps
+        if item.type in AGO_APP_TYPES:
+            entry['sourceItems'] = {item_id: _source_signature(item_id) for item_id in sorted(source_items)}
+        return item.id, entry, True
+
+    def _collect_rows():
+        # Item data is fetched over HTTP, so a bounded thread pool overlaps the round-trips.
+        # Results come back in search order, keeping the rows identical to the serial path.
+        for item_id, entry, changed in ordered_map(_process, _enumerate_items(), agoMaxWorkers):
+            sync_counts['changed' if changed else 'unchanged'] += 1
+            metrics.count('ago_items', sync='changed' if changed else 'unchanged')
+            rows = [tuple(row) for row in entry['rows']]
+            # Items that failed are left out of the state so they are retried on the next run
+            if agoStateFile and not any(row[5] == "ERROR" and row[6] == "PROCESSING ERROR" for row in rows):
+                current_state[item_id] = entry
+            yield from rows
+
+    try:
+        # Apply only the differences to the SQL table, writing rows as items are interrogated
+        fields = ["ItemID", "ItemType", "ItemName", "ItemURL", "AGOAccount", "AGOAccountFolder", "LayerName", "LayerURL"]
+        apply_table_delta(agoInventoryTable, fields, ["ItemID", "LayerName", "LayerURL"], _collect_rows())
+
+        # Only record the new state once the table reflects it
+        if agoStateFile:
+            removed = len(set(previous_state) - seen_item_ids)
+            print(f"  AGO incremental sync: {sync_counts['changed']} new or changed, "
+                  f"{sync_counts['unchanged']} unchanged, {removed} removed.")
+            save_json_state(agoStateFile, {'items': current_state, 'folders': folder_cache.state()})
+
+    except Exception as e:
+        print(f"\nFATAL ERROR during database operation: {e}")
+        print("Data was collected but the database could not be updated. The batch in progress was rolled back; "
+              "the state file was not updated, so the next run reconciles the table again.")
+        raise
+
@@ -0,0 +1,282 @@
+"""ArcGIS Server services and layers, collected over the REST and Administrator APIs. requests and arcgis are imported on first use."""
+
+from functools import partial
+from urllib.parse import urlsplit
+
+from . import metrics
+from .parallel import chain_concurrently, ordered_map
+from .response_cache import ResponseCache
+from .writer import apply_table_delta, intern_value
+
+# HTTP session with a connection pool for one host
+def _record_response(response, *args, **kwargs):
+    """Response hook counting every request a session makes, by host and status class."""
+    host = urlsplit(response.url).netloc
+    metrics.count('http_requests', host=host, status=f"{response.status_code // 100}xx")
+    metrics.observe('http_request', response.elapsed.total_seconds(), host=host)
+
+def _create_http_session(pool_size):
+    """
+    Creates a requests session whose connection pool holds pool_size keep-alive
+    connections, so concurrent requests to the same host reuse connections instead
+    of opening a new one per request. Every response is counted in the run metrics.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.verify = False # For older servers with SSL issues
+    session.hooks['response'].append(_record_response)
+    return session
+
+# Inventory rows for a single ArcGIS Server service
+def _service_layers(service_data):
+    """The (name, type, id) of every layer in a service's REST JSON, or None for an error response."""
+    if 'error' in service_data:
+        return None
+    return [(layer.get('name', 'N/A'), layer.get('type', 'Unknown Type'), layer.get('id', None))
+            for layer in service_data.get('layers') or []]
+
+def _build_ags_service_rows(ags_Base_URL, folder, serviceName, serviceType, service_status, session, timeout, response_cache=None):
+    """
+    Reads the REST layer list of one service and returns its inventory rows as tuples
+    in table field order (serviceURL, serviceName, serviceType, layerName, layerType,
+    layerID, serviceLayerURL, serviceStatus). With a response_cache, a service whose
+    JSON has not changed since it was cached is not parsed again.
+    """
+    services_info = []
+    folderDirectory = "/" if folder == "/" else f"/{folder}/"
+    service_url = intern_value(f"{ags_Base_URL}/arcgis/rest/services{folderDirectory}{serviceName}/{serviceType}")
+    serviceName, serviceType, service_status = intern_value(serviceName), intern_value(serviceType), intern_value(service_status)
+
+    with metrics.timer('ags_service_json', record=service_url, server=ags_Base_URL):
+        if response_cache is not None:
+            status_code, layers = response_cache.get_parsed(session, f"{service_url}?f=json", timeout, _service_layers)
+        else:
+            response = session.get(f"{service_url}?f=json", timeout=timeout)
+            status_code = response.status_code
+            layers = _service_layers(response.json()) if status_code == 200 else None
+    if status_code == 200:
+        if layers:
+            for layerName, layerType, layerID in layers:
+                services_info.append((service_url,
+                                      serviceName,
+                                      serviceType,
+                                      layerName,
+                                      intern_value(layerType),
+                                      layerID,
+                                      f"{service_url}/{'' if layerID is None else layerID}",
+                                      service_status))
+        else:
+            services_info.append((service_url, serviceName, serviceType, 'N/A', 'N/A', None, service_url, service_status))
+    else:
+        print(f"Warning: Could not access REST endpoint for {service_url}. Status: {status_code}")
+    return services_info
+
+def _get_ags_service_rows(service, folder, ags_Base_URL, session, timeout, response_cache=None):
+    """
+    Reads the status and REST layer list of one service and returns its inventory rows.
+    Errors are contained to the service, so services can be processed concurrently.
+    """
+    try:
+        # Inner Try/Except for property access
+        try:
+            # Modern property access
+            serviceName = service.properties['serviceName']
+            serviceType = service.properties['type']
+        except (AttributeError, KeyError):
+            # Legacy property access
+            serviceName = service.serviceName
+            serviceType = service.type
+
+        with metrics.timer('ags_service_status', server=ags_Base_URL):
+            status_dict = service.status
+        service_status = status_dict.get('realTimeState', 'UNKNOWN')
+
+        return _build_ags_service_rows(ags_Base_URL, folder, serviceName, serviceType, service_status, session, timeout, response_cache)
+    except Exception as inner_e:
+        print(f"ERROR: Could not process service '{getattr(service, 'serviceName', 'UNKNOWN')}' in folder '{folder}'. Details: {inner_e}")
+        return []
+
+def _get_reported_ags_service_rows(report, folder, ags_Base_URL, session, timeout, response_cache=None):
+    """Builds the inventory rows for one entry of a folder-level services report."""
+    try:
+        status_dict = report.get('status') or {}
+        service_status = status_dict.get('realTimeState', 'UNKNOWN')
+        return _build_ags_service_rows(ags_Base_URL, folder, report['serviceName'], report['type'], service_status, session, timeout,
+                                       response_cache)
+    except Exception as inner_e:
+        print(f"ERROR: Could not process service '{report.get('serviceName', 'UNKNOWN')}' in folder '{folder}'. Details: {inner_e}")
+        return []
+
+# Folder-level reports from the ArcGIS Server Administrator API
+def _get_ags_folder_reports(ags_Base_URL, agsUsername, agsPassword, session, timeout):
+    """
+    Collects the name, type and status of every service on a site with one admin
+    request per folder, using the folder 'report' resource. Returns a list of
+    (folder, report entries) in folder order, or None when the site does not support
+    these resources (older 10.x servers), so the caller can fall back to the
+    per-service path.
+    """
+    token_response = session.post(f"{ags_Base_URL}/arcgis/tokens/generateToken",
+                                  data={'username': agsUsername, 'password': agsPassword,
+                                        'client': 'referer', 'referer': ags_Base_URL,
+                                        'expiration': 60, 'f': 'json'},
+                                  timeout=timeout)
+    token = token_response.json().get('token') if token_response.status_code == 200 else None
+    if not token:
+        return None
+    session.headers['Referer'] = ags_Base_URL
+
+    admin_url = f"{ags_Base_URL}/arcgis/admin/services"
+    # Admin requests are POSTed so the token stays out of the server's and proxies' access logs
+    root_response = session.post(admin_url, data={'f': 'json', 'token': token}, timeout=timeout)
+    root_data = root_response.json() if root_response.status_code == 200 else {}
+    if 'folders' not in root_data:
+        return None
+
+    folders = list(root_data['folders'])
+    if '/' not in folders:
+        folders.insert(0, '/')
+
+    folder_reports = []
+    for folder in folders:
+        report_url = f"{admin_url}/report" if folder == '/' else f"{admin_url}/{folder}/report"
+        report_response = session.post(report_url, data={'f': 'json', 'token': token, 'parameters': '["STATUS"]'}, timeout=timeout)
+        report_data = report_response.json() if report_response.status_code == 200 else {}
+        if 'reports' not in report_data:
+            return None
+        folder_reports.append((folder, report_data['reports']))
+    return folder_reports
+
+# Crawl of a single ArcGIS Server site
+def _crawl_ags_server(ags_Base_URL, agsUsername, agsPassword, max_workers, timeout, bulk_reports=False, response_cache=None):
+    """
+    Lists every service on one ArcGIS Server site and yields their inventory rows.
+    Services are processed by up to max_workers threads sharing one pooled session,
+    which caps the number of concurrent requests against the host. Rows are yielded
+    in folder and service order regardless of completion order, as soon as each
+    service is done.
+
+    With bulk_reports, service names, types and statuses come from one admin report
+    per folder instead of a list call per folder plus a status call per service. Sites
+    without the report resource fall back to the per-service path. Service JSON goes
+    through response_cache when one is given.
+
+    A site that cannot be reached or listed raises after its error is printed, so the
+    caller does not take its missing rows for deleted services.
+    """
+    if bulk_reports:
+        with _create_http_session(max_workers) as session:
+            try:
+                folder_reports = _get_ags_folder_reports(ags_Base_URL, agsUsername, agsPassword, session, timeout)
+                if folder_reports is None:
+                    print(f"  Folder reports are not available on {ags_Base_URL}, falling back to per-service requests.")
+            except Exception as e:
+                print(f"  Folder reports failed on {ags_Base_URL}, falling back to per-service requests. Details: {e}")
+                folder_reports = None
+
+            if folder_reports is not None:
+                report_tasks = ((report, folder) for folder, reports in folder_reports for report in reports)
+                for rows in ordered_map(lambda task: _get_reported_ags_service_rows(task[0], task[1], ags_Base_URL, session, timeout,
+                                                                                        response_cache),
+                                         report_tasks, max_workers):
+                    yield from rows
+                return
+
+    try:
+        from arcgis.gis.server import Server
+
+        server = Server(url=f"{ags_Base_URL}/arcgis/admin",
+                        token_url=f"{ags_Base_URL}/arcgis/tokens/generateToken",
+                        username=agsUsername,
+                        password=agsPassword)
+    except Exception as conn_e:
+        print(f"FATAL ERROR connecting to server {ags_Base_URL}: {conn_e}")
+        raise
+
+    try:
+        # --- Find the correct Service Manager ---
+        if hasattr(server, 'services'):
+            # MODERN PATH (arcgis API >= 1.5)
+            service_manager = server.services
+        elif hasattr(server, 'manager'):
+            # LEGACY PATH (arcgis API < 1.5)
+            service_manager = server.manager
+        else:
+            print(f"ERROR: Could not find a valid services manager on server object for {ags_Base_URL}. Skipping.")
+            return
+
+        folders = list(service_manager.folders)
+        if '/' not in folders:
+            folders.insert(0, '/')
+
+        # Services are listed folder by folder as the shared pool works through them
+        def _service_tasks():
+            for folder in folders:
+                # For root folder, the folder parameter must be an empty string or not present
+                current_folder_path = folder if folder != '/' else ""
+                with metrics.timer('ags_service_list', server=ags_Base_URL):
+                    services = service_manager.list(folder=current_folder_path)
+                for service in services:
+                    yield service, folder
+
+        with _create_http_session(max_workers) as session:
+            for rows in ordered_map(lambda task: _get_ags_service_rows(task[0], task[1], ags_Base_URL, session, timeout, response_cache),
+                                     _service_tasks(), max_workers):
+                yield from rows
+
+    except Exception as e:
+        print(f"FATAL ERROR processing server {ags_Base_URL}: {e}")
+        raise
+
+# ArcGIS Server Function
+def GetArcGISServerData(arcGISServerInventoryTable, ags_Base_URLs, agsUsername, agsPassword, agsMaxWorkersPerHost=1, agsRequestTimeout=60, agsBulkReports=False,
+                        agsResponseCacheFile=None, agsResponseCacheMegabytes=64):
+    """
+    Connects to ArcGIS Server instances, retrieves service information, and writes
+    service details to a SQL table.
+
+    This function is highly version-agnostic and compatible with modern (11.x) and
+    very old (10.x) ArcGIS Enterprise environments. It handles three layers of
+    potential API version differences:
+    1. The services manager access point ('server.services' vs. 'server.manager').
+    2. The structure of the returned folder list (list vs. generator).
+    3. The method for accessing service properties (direct attribute vs. '.properties' dict).
+
+    Sites are crawled in parallel. Within a site, service status and REST JSON are fetched
+    by up to agsMaxWorkersPerHost threads over one keep-alive connection pool, and every
+    request is bounded by agsRequestTimeout seconds. Rows are streamed to the table writer
+    in the same order as a serial crawl, with each site buffering a bounded number of rows.
+
+    With agsBulkReports, each folder is collected with one Administrator API report
+    request instead of per-service admin calls, falling back per site on servers that
+    do not support it.
+
+    With agsResponseCacheFile, service JSON is cached between runs (see ResponseCache) and
+    revalidated with conditional requests, so unchanged services are not parsed again. The
+    cache is held to agsResponseCacheMegabytes.
+    """
+    response_cache = ResponseCache(agsResponseCacheFile, agsResponseCacheMegabytes * 2**20, 'ags') if agsResponseCacheFile else None
+
+    def _crawl(ags_Base_URL):
+        with metrics.timer('ags_server', server=ags_Base_URL):
+            yield from _crawl_ags_server(ags_Base_URL, agsUsername, agsPassword, agsMaxWorkersPerHost, agsRequestTimeout, agsBulkReports,
+                                         response_cache)
+
+    services_info = chain_concurrently([partial(_crawl, ags_Base_URL) for ags_Base_URL in ags_Base_URLs])
+
+    # --- Update SQL Table ---
+    try:
+        fields = ["serviceURL","serviceName","serviceType","layerName","layerType","layerID","serviceLayerURL","serviceStatus"]
+        apply_table_delta(arcGISServerInventoryTable, fields, ["serviceURL", "layerID"], services_info)
+    except Exception as db_e:
+        print(f"FATAL ERROR during database write operation: {db_e}")
+        raise
+    finally:
+        if response_cache is not None:
+            response_cache.close()
+
@@ -0,0 +1,207 @@
+"""ArcGIS Pro project maps and layers, read from the project CIM or, failing that, arcpy.mp."""
+
+import json
+import zipfile
+from pathlib import Path
+
+from . import metrics
+from .parallel import map_processes
+from .state import file_sha256, load_json_state, save_json_state
+from .writer import apply_table_delta, arcpy_lock
+
+# Layer rows of a single ArcGIS Pro project
+def _extract_aprx_rows(aprx_file):
+    """Opens one project with arcpy.mp and returns a row for every layer of every map."""
+    import arcpy
+
+    aprx_file_str = str(aprx_file).replace("\\", "/")
+    aprx_rows = []
+
+    with metrics.timer('arcpy_call', call='ArcGISProject'):
+        aprx = arcpy.mp.ArcGISProject(str(aprx_file))
+
+    for map in aprx.listMaps():
+        mapName = map.name
+        # Iterate through layers in the map
+        for layerID, layer in enumerate(map.listLayers()):
+            layerName = layer.name
+            layerSource = None
+            serverName = databaseName = datasetName = dataSource = None
+
+            if not layer.isGroupLayer:
+                if layer.supports("DATASOURCE"):
+                    layerSource = layer.dataSource
+
+                    if "Server=" in layerSource:
+                        # Extract the server name and database name from the data source
+                        layerSourceData = layerSource.split(',')
+                        serverName = layerSourceData[0].split('=')[1]
+                        databaseName = layerSourceData[1].split('=')[1]
+                        databaseUser = layerSourceData[3].split('=')[1]
+                        datasetName = layerSourceData[-1].split('=')[1]
+                        dataSource = f"{serverName}|{datasetName}"
+
+            row = (aprx_file_str, mapName, layerName, layerID, serverName, databaseName, datasetName, dataSource)
+            aprx_rows.append(row)
+    return aprx_rows
+
+# Layer rows of a single ArcGIS Pro project, read straight from its CIM documents
+def _parse_workspace_connection_string(connection_string):
+    """Splits a CIM workspaceConnectionString (KEY=VALUE;KEY=VALUE) into an upper-cased key dictionary."""
+    properties = {}
+    for part in (connection_string or "").split(';'):
+        if '=' in part:
+            key, value = part.split('=', 1)
+            properties[key.strip().upper()] = value.strip()
+    return properties
+
+def _read_aprx_cim_rows(aprx_file):
+    """
+    Reads a Pro 3.x project without arcpy. An .aprx is a zip archive of CIM JSON documents:
+    each map lists its layers by CIMPATH URI, group layers list their children the same
+    way, and each layer document carries its data connection. Layers are numbered in the
+    same depth-first order as Map.listLayers(). Raises ValueError for projects it cannot
+    read (for example Pro 2.x projects, which store XML), so the caller can fall back
+    to arcpy.mp.
+    """
+    aprx_file_str = str(aprx_file).replace("\\", "/")
+    documents = {}
+    maps = []
+    with zipfile.ZipFile(aprx_file) as archive:
+        for member in archive.namelist():
+            if not member.lower().endswith('.json'):
+                continue
+            document = json.loads(archive.read(member).decode('utf-8-sig'))
+            if not isinstance(document, dict):
+                continue
+            # A map document may embed its map and layer definitions instead of referencing them
+            if document.get('type') == 'CIMMapDocument':
+                for layer_definition in document.get('layerDefinitions') or []:
+                    documents[layer_definition.get('uRI')] = layer_definition
+                document = document.get('mapDefinition') or {}
+            documents[document.get('uRI') or f"CIMPATH={member}"] = document
+            if document.get('type') == 'CIMMap':
+                maps.append(document)
+    if not maps:
+        raise ValueError("no CIM map definitions found")
+
+    aprx_rows = []
+    for map_definition in maps:
+        mapName = map_definition.get('name')
+        layers = []
+
+        def _flatten(layer_uris):
+            for layer_uri in layer_uris or []:
+                layer = documents.get(layer_uri)
+                if layer is None:
+                    raise ValueError(f"missing layer document {layer_uri}")
+                layers.append(layer)
+                if layer.get('type') == 'CIMGroupLayer':
+                    _flatten(layer.get('layers'))
+        _flatten(map_definition.get('layers'))
+
+        for layerID, layer in enumerate(layers):
+            serverName = databaseName = datasetName = dataSource = None
+            if layer.get('type') != 'CIMGroupLayer':
+                connection = (layer.get('featureTable') or {}).get('dataConnection') or layer.get('dataConnection') or {}
+                properties = _parse_workspace_connection_string(connection.get('workspaceConnectionString'))
+                if connection.get('workspaceFactory') == 'SDE' and ('SERVER' in properties or 'INSTANCE' in properties):
+                    serverName = properties.get('SERVER') or properties['INSTANCE'].split(':')[-1].split('\\')[0]
+                    databaseName = properties.get('DATABASE')
+                    datasetName = connection.get('dataset')
+                    dataSource = f"{serverName}|{datasetName}"
+            aprx_rows.append((aprx_file_str, mapName, layer.get('name'), layerID, serverName, databaseName, datasetName, dataSource))
+    return aprx_rows
+
+def _try_read_aprx_cim_rows(aprx_file):
+    """Process pool wrapper around _read_aprx_cim_rows: returns (rows, None) or (None, error message)."""
+    try:
+        with metrics.timer('aprx_project', record=aprx_file, reader='cim'):
+            return _read_aprx_cim_rows(aprx_file), None
+    except Exception as e:
+        return None, str(e)
+
+# APRX File Data Function
+def GetArcGISProRESTData(restAprxDirectory, restAprxDatabaseTable, aprxManifestFile=None, aprxMaxWorkers=1):
+    """
+    Inventories the maps and layers of every ArcGIS Pro project under restAprxDirectory
+    and writes one row per layer to restAprxDatabaseTable, with the enterprise
+    geodatabase source where it has one.
+
+    When aprxManifestFile is set, a manifest of each project's mtime, size, content hash
+    and extracted rows is kept between runs. Projects whose mtime and size (or, failing
+    that, hash) are unchanged are not opened at all, and only the table rows belonging
+    to added, changed or removed projects are touched.
+
+    Projects are read directly from their CIM JSON documents, without arcpy, by up to
+    aprxMaxWorkers worker processes. Projects the CIM reader cannot parse are opened
+    with arcpy.mp instead.
+    """
+
+    # ArcGIS Pro Documents REST Directory ====================
+    root_path = Path(restAprxDirectory)
+    aprx_files = list(root_path.rglob('*.aprx'))
+    aprxRESTfields = ["path_windows", "mapName", "layerName", "layerID", "ServerName", "DatabaseName", "DatasetName", "Datasource"]
+
+    previous_manifest = load_json_state(aprxManifestFile).get('files', {}) if aprxManifestFile else {}
+    current_manifest = {}
+    changed_files = []
+    for aprx_file in aprx_files:
+        aprx_file_str = str(aprx_file).replace("\\", "/")
+        try:
+            file_stat = aprx_file.stat()
+            previous = previous_manifest.get(aprx_file_str)
+            if previous and previous['mtime'] == file_stat.st_mtime and previous['size'] == file_stat.st_size:
+                current_manifest[aprx_file_str] = previous
+                continue
+
+            file_hash = file_sha256(aprx_file)
+            if previous and previous['hash'] == file_hash:
+                # Touched but not modified, so only the recorded mtime moves on
+                current_manifest[aprx_file_str] = dict(previous, mtime=file_stat.st_mtime, size=file_stat.st_size)
+                continue
+
+            changed_files.append((aprx_file, aprx_file_str, {'mtime': file_stat.st_mtime, 'size': file_stat.st_size, 'hash': file_hash}))
+        except Exception as e:
+            print(f"    ERROR reading project {aprx_file_str}: {e}")
+            if aprx_file_str in previous_manifest:
+                current_manifest[aprx_file_str] = dict(previous_manifest[aprx_file_str], mtime=None)
+
+    # Read the changed projects from their CIM documents across a process pool
+    cim_results = map_processes(_try_read_aprx_cim_rows, [aprx_file for aprx_file, aprx_file_str, entry in changed_files],
+                                 aprxMaxWorkers, (None, "worker process failed"))
+
+    changed_rows = {}
+    for (aprx_file, aprx_file_str, entry), (rows, cim_error) in zip(changed_files, cim_results):
+        try:
+            if rows is None:
+                # Fall back to arcpy.mp for projects the CIM reader cannot parse
+                print(f"    Reading {aprx_file_str} with arcpy.mp ({cim_error})")
+                with arcpy_lock, metrics.timer('aprx_project', record=aprx_file, reader='arcpy'):
+                    rows = _extract_aprx_rows(aprx_file)
+            changed_rows[aprx_file_str] = rows
+            current_manifest[aprx_file_str] = dict(entry, rows=rows)
+        except Exception as e:
+            # Leave the project's existing rows alone and retry it on the next run
+            print(f"    ERROR processing project {aprx_file_str}: {e}")
+            if aprx_file_str in previous_manifest:
+                current_manifest[aprx_file_str] = dict(previous_manifest[aprx_file_str], mtime=None)
+
+    removed_files = set(previous_manifest) - set(current_manifest)
+    if aprxManifestFile:
+        print(f"  APRX manifest: {len(changed_rows)} new or changed, {len(removed_files)} removed, "
+              f"{len(current_manifest) - len(changed_rows)} unchanged.")
+
+    if not previous_manifest:
+        # No manifest to go on, so reconcile the whole table
+        aprx_rows = (tuple(row) for entry in current_manifest.values() for row in entry['rows'])
+        apply_table_delta(restAprxDatabaseTable, aprxRESTfields, ["path_windows", "mapName", "layerID"], aprx_rows)
+    elif changed_rows or removed_files:
+        aprx_rows = (row for rows in changed_rows.values() for row in rows)
+        apply_table_delta(restAprxDatabaseTable, aprxRESTfields, ["path_windows", "mapName", "layerID"], aprx_rows,
+                           scope_field="path_windows", scope_values=set(changed_rows) | removed_files)
+
+    # Only record the new manifest once the table reflects it
+    if aprxManifestFile:
+        save_json_state(aprxManifestFile, {'files': current_manifest})
+
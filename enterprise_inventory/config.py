@@ -0,0 +1,122 @@
+# Created by Daniel Jarvis -  5/1/2025
+#
+# Organization parameters for the Enterprise Inventory. Modify the values between the
+# bounding comments to match your organization.
+
+import os
+import socket
+from functools import lru_cache
+
+# Organization Parameters start
+# =======================
+
+server_name = socket.gethostname()
+
+# Path to DB where your inventory tables are stored. Tables in a SQLite database (a path like
+# D:/Inventory/Inventory.sqlite/EnterpriseInventoryAGODataSources) are created with the inventory
+# schema on first run and written with sqlite3 instead of arcpy, e.g. for a local test copy
+inventoryDatabase = f"//{server_name}/d/PythonScripts/SDEFiles/AHS_PROD_EPHT.sde"
+# ArcGIS Online Table
+agoInventoryTable = f"//{server_name}/d/PythonScripts/SDEFiles/AHS_PROD_EPHT.sde/EnterpriseInventoryAGODataSources"
+# ArcGIS Server Table
+arcGISServerInventoryTable = f"//{server_name}/d/PythonScripts/SDEFiles/AHS_PROD_EPHT.sde/EnterpriseInventoryArcGISServer"
+# Domain Names Types and Values Table
+domainTable = f"//{server_name}/d/PythonScripts/SDEFiles/AHS_PROD_EPHT.sde/EnterpriseInventoryDomainTable"
+# Domain Usage Table
+domainUsageTable = f"//{server_name}/d/PythonScripts/SDEFiles/AHS_PROD_EPHT.sde/EnterpriseInventoryDomainUsage"
+# Database Content Table
+databaseInventoryTable = f"//{server_name}/d/PythonScripts/SDEFiles/AHS_PROD_EPHT.sde/EnterpriseInventoryDatabaseContent"
+# APRX REST Service Map Files Table
+restAprxDatabaseTable = f"//{server_name}/d/PythonScripts/SDEFiles/AHS_PROD_EPHT.sde/EnterpriseInventoryRESTServiceMapFileData"
+# Power BI Data Sources Table (populated elsewhere; read for the relationship index, None to leave it out)
+pbiDataTable = f"//{server_name}/d/PythonScripts/SDEFiles/AHS_PROD_EPHT.sde/EnterpriseInventoryPBIDataSources"
+# SDE File Directory
+databaseFileDirectory = f"//{server_name}/d/PythonScripts/SDEFiles"
+# SDE File Names
+databaseFileNames = ["ADAP_DEV_Admin.sde","ADAP_TEST_Admin.sde","ADAP_PROD_Admin.sde",
+                     "AHS_DEV_EPHT.sde","AHS_TEST_EPHT.sde","AHS_PROD_EPHT.sde",
+                     "EnvHealth_DEV_Admin.sde","EnvHealth_TEST_Admin.sde","EnvHealth_PROD_Admin.sde",
+                     "HOC_DEV_Admin.sde","HOC_TEST_Admin.sde","HOC_PROD_Admin.sde",
+                     "Surveillance_DEV_Admin.sde","Surveillance_TEST_Admin.sde","Surveillance_PROD_Admin.sde"]
+# Worker processes for per-database stages (one per connection file; 1 processes databases one at a time)
+databaseMaxWorkers = len(databaseFileNames)
+# Read domains and domain usage from the geodatabase system tables instead of arcpy (see CheckDomainSystemTables)
+useGdbSystemTables = False
+# Owner schema and DBMS of the geodatabase system tables, by connection file name, for connections that are not
+# ('sde', 'sqlserver'): owner 'sde' or 'dbo', DBMS 'sqlserver', 'postgresql' or 'oracle'. For example:
+# {"ADAP_PROD_Admin.sde": ("dbo", "sqlserver")}
+gdbSystemTableLocations = {}
+# APRX Files Directory
+restAprxDirectory = f"//{server_name}/d/RESTServices"
+# Worker processes reading APRX files
+aprxMaxWorkers = os.cpu_count() or 1
+# Credentials files for ArcGIS Online and ArcGIS Server
+serverCredsFile = f"//{server_name}/D/PythonScripts/creds/hashServerProd.txt"
+agoCredsFile = f"//{server_name}/D/PythonScripts/creds/hashAGOIT.txt"
+
+# ArcGIS Online URL and base URLs for ArcGIS Server
+ago_url = "https://ahs-vt.maps.arcgis.com/"
+ags_Base_URLs = ["https://maps.healthvermont.gov","https://mapstest.healthvermont.gov"]
+
+# Number of ArcGIS Online items interrogated concurrently (1 processes items one at a time)
+agoMaxWorkers = 8
+# Add a row for every layer of the web maps that apps, dashboards and experiences reference
+# (otherwise apps only point at their web map's item page)
+agoExpandWebMaps = False
+
+# Directory for state kept between runs (incremental sync, caches)
+stateDirectory = f"//{server_name}/d/PythonScripts/EnterpriseInventoryState"
+# ArcGIS Online incremental sync state file (set to None to interrogate every item on every run)
+agoStateFile = f"{stateDirectory}/AGODataSources.json"
+# Hours that AGO folder titles are cached in the state file before they are looked up again
+agoFolderCacheHours = 24
+# APRX manifest file for incremental project scanning (set to None to open every project on every run)
+restAprxManifestFile = f"{stateDirectory}/RESTServiceMapFiles.json"
+
+# Concurrent requests per ArcGIS Server host, and the timeout in seconds for each request
+agsMaxWorkersPerHost = 8
+agsRequestTimeout = 60
+# Collect service names and statuses with one admin report per folder (older 10.x servers fall back automatically)
+agsBulkReports = True
+# Cache of service JSON kept between runs and revalidated with conditional requests (set to None to disable),
+# and its size limit in megabytes
+agsResponseCacheFile = f"{stateDirectory}/AGSResponseCache.sqlite"
+agsResponseCacheMegabytes = 64
+
+# Relationship index for the web application (served by the data server; set to None to skip it)
+relationshipIndexFile = f"{stateDirectory}/RelationshipIndex.json"
+# Compressed snapshot of every inventory table for the web application, written with a .manifest.json and a
+# .search.json.gz next to it (served by the data server; set to None to skip it)
+snapshotFile = f"{stateDirectory}/InventorySnapshot.json.gz"
+
+# Data server (python -m enterprise_inventory.dataserver): serves the snapshot and the indexes to the web
+# application only to users whose token the inventory map service (CONFIG.serverUrl in app.js) accepts
+inventoryServiceUrl = "https://maps.healthvermont.gov/arcgis/rest/services/EnterpriseInventory/MapServer"
+dataServerHost = "0.0.0.0"
+dataServerPort = 8765
+
+# Run report (JSON) and Prometheus textfile written at the end of every run (set either to None to skip it)
+runReportFile = f"{stateDirectory}/RunReport.json"
+prometheusTextFile = f"{stateDirectory}/enterprise_inventory.prom"
+# Directory for a cProfile dump of each stage (None disables profiling; --profile DIR also enables it)
+profileDirectory = None
+
+# =======================
+# Organization Parameters end
+
+# Credentials are read on first use, so stages that do not need them never open the files
+def _read_credentials(credsFile):
+    """Reads a 'username,password' credentials file."""
+    with open(credsFile, 'r') as f:
+        creds = f.read().strip().split(',')
+    return creds[0], creds[1]
+
+@lru_cache(maxsize=None)
+def ags_credentials():
+    """ArcGIS Server (username, password)."""
+    return _read_credentials(serverCredsFile)
+
+@lru_cache(maxsize=None)
+def ago_credentials():
+    """ArcGIS Online (username, password)."""
+    return _read_credentials(agoCredsFile)
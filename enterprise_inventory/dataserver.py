@@ -0,0 +1,166 @@
+"""
+Token-checked endpoint that serves the inventory snapshot, its search index and the
+relationship index to the web application, behind the same ArcGIS Server authentication
+as the inventory map service: python -m enterprise_inventory.dataserver
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import config
+from .snapshot import search_index_file, snapshot_manifest_file
+from .state import load_json_state
+
+# Seconds a token the inventory map service accepted is trusted before it is checked again
+TOKEN_CHECK_SECONDS = 300
+
+def published_files(snapshotFile, relationshipIndexFile):
+    """The files served to the web application, as the name it requests each under -> path."""
+    paths = []
+    if snapshotFile:
+        paths += [snapshot_manifest_file(snapshotFile), snapshotFile, search_index_file(snapshotFile)]
+    if relationshipIndexFile:
+        paths.append(relationshipIndexFile)
+    return {os.path.basename(path): path for path in paths}
+
+def _listed_version(manifest, name):
+    """(content hash, hash of the file's bytes) the manifest lists for the versioned file name, or None."""
+    if name == manifest.get('file'):
+        return manifest.get('hash'), manifest.get('fileHash')
+    search_index = manifest.get('searchIndex') or {}
+    if name == search_index.get('file'):
+        return search_index.get('hash'), search_index.get('fileHash')
+    return None
+
+# Token check against the inventory map service
+class _TokenChecker:
+    """
+    Accepts the tokens the inventory map service accepts. A token is sent to the service
+    with the Referer of the request it came with, as the web application's own map
+    service queries send it, and a token accepted is remembered for TOKEN_CHECK_SECONDS.
+    """
+
+    def __init__(self, service_url, timeout):
+        self._service_url = service_url
+        self._timeout = timeout
+        self._accepted = {}
+        self._lock = threading.Lock()
+
+    def accepts(self, token, referer):
+        import requests
+
+        key = hashlib.sha256(f"{token}|{referer}".encode('utf-8')).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            if self._accepted.get(key, 0) > now:
+                return True
+        try:
+            # POSTed so the token stays out of the service's access logs
+            response = requests.post(self._service_url, data={'f': 'json', 'token': token},
+                                     headers={'Referer': referer} if referer else {}, timeout=self._timeout)
+            accepted = response.ok and 'error' not in response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"  WARNING: Could not check a token against {self._service_url}: {e}")
+            accepted = False
+        if accepted:
+            with self._lock:
+                self._accepted = {k: expiry for k, expiry in self._accepted.items() if expiry > now}
+                self._accepted[key] = now + TOKEN_CHECK_SECONDS
+        return accepted
+
+class _DataRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the published files by name to requests carrying an accepted token in
+    X-Esri-Authorization. A versioned request (?v=content hash) is only answered with
+    the bytes the current manifest lists under that hash, which are cached for good.
+    """
+    files = {}
+    manifest_path = None
+    token_checker = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = url.path.rsplit('/', 1)[-1]
+        path = self.files.get(name)
+        if path is None:
+            return self.send_error(404)
+
+        authorization = self.headers.get('X-Esri-Authorization', '')
+        token = authorization[len('Bearer '):].strip() if authorization.startswith('Bearer ') else ''
+        if not token:
+            return self.send_error(401, "A token is required")
+        if not self.token_checker.accepts(token, self.headers.get('Referer')):
+            return self.send_error(403, "The token was not accepted by the inventory map service")
+
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            return self.send_error(404)
+
+        requested_version = parse_qs(url.query).get('v', [None])[0]
+        listed = _listed_version(load_json_state(self.manifest_path), name) if self.manifest_path else None
+        versioned = requested_version is not None and listed is not None
+        if versioned:
+            content_hash, file_hash = listed
+            # A client holding another manifest, or a file rewritten after the manifest was read, gets nothing to cache
+            if requested_version != content_hash or (file_hash and hashlib.sha256(content).hexdigest() != file_hash):
+                self.send_response(404)
+                self.send_header('Cache-Control', 'no-store')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/gzip' if path.endswith('.gz') else 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        if versioned:
+            # The bytes of a version never change, whoever asks, so they are cached across sign-ins
+            self.send_header('Cache-Control', 'private, max-age=31536000, immutable')
+        else:
+            # The manifest and the relationship index are revalidated
+            self.send_header('Cache-Control', 'private, no-cache')
+            self.send_header('Vary', 'X-Esri-Authorization')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        print(f"  {self.address_string()} {format % args}")
+
+# Data Server Function
+def ServeInventoryData(host, port, inventoryServiceUrl, snapshotFile, relationshipIndexFile, requestTimeout=30):
+    """
+    Serves the snapshot, its manifest and search index, and the relationship index to
+    the web application until interrupted. Every request must carry the user's ArcGIS
+    Server token (X-Esri-Authorization: Bearer <token>), and is only answered if the
+    inventory map service (inventoryServiceUrl) accepts that token, so the files are
+    exactly as protected as the map service. Put it behind the reverse proxy at the
+    web application's data/ path (see the README).
+    """
+    handler = type('DataRequestHandler', (_DataRequestHandler,),
+                   {'files': published_files(snapshotFile, relationshipIndexFile),
+                    'manifest_path': snapshot_manifest_file(snapshotFile) if snapshotFile else None,
+                    'token_checker': _TokenChecker(inventoryServiceUrl, requestTimeout)})
+    with ThreadingHTTPServer((host, port), handler) as server:
+        print(f"Serving {', '.join(handler.files)} on {host}:{port}, checking tokens against {inventoryServiceUrl}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the inventory snapshot and indexes to the web application, token-checked.")
+    parser.add_argument('--host', default=config.dataServerHost, help="Address to listen on (default %(default)s).")
+    parser.add_argument('--port', type=int, default=config.dataServerPort, help="Port to listen on (default %(default)s).")
+    args = parser.parse_args(argv)
+    ServeInventoryData(args.host, args.port, config.inventoryServiceUrl, config.snapshotFile, config.relationshipIndexFile)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
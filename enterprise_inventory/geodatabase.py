@@ -0,0 +1,440 @@
+"""Enterprise geodatabase catalogs, domains, domain usage and content. arcpy is imported on first use."""
+
+import os
+import sqlite3
+from collections import Counter
+from contextlib import closing
+from functools import partial
+from xml.etree import ElementTree
+
+from . import metrics
+from .parallel import map_processes
+from .writer import SQLITE_EXTENSIONS, apply_table_delta, arcpy_lock, intern_value, normalize_value
+
+# Per-geodatabase execution, optionally across worker processes
+def _map_databases(func, databaseFileDirectory, databaseFileNames, max_workers, empty_result, **kwargs):
+    """
+    Calls func(databaseFileDirectory, database, **kwargs) for every database and yields the
+    results in databaseFileNames order. With max_workers above 1 the databases are
+    processed by a pool of worker processes, one database per task, since arcpy is
+    not thread-safe. A worker that fails outright is reported and contributes
+    empty_result for its database. Each call is timed per database in the run metrics
+    and, when it runs in this process, holds arcpy_lock, so stages running alongside
+    can use arcpy between databases.
+    """
+    return map_processes(partial(_timed_database_call, func, databaseFileDirectory, **kwargs), databaseFileNames, max_workers, empty_result)
+
+def _timed_database_call(func, databaseFileDirectory, database, **kwargs):
+    with arcpy_lock, metrics.timer(func.__name__.lstrip('_'), database=database):
+        return func(databaseFileDirectory, database, **kwargs)
+
+# Domains of a single enterprise geodatabase
+def _collect_database_domains(databaseFileDirectory, database):
+    """Returns the domain rows for one geodatabase. Errors are contained to the database."""
+    import arcpy
+
+    domain_data_store = []
+
+    # Get Domain Information
+    try:
+        sde_connection = os.path.join(databaseFileDirectory, database)
+        with metrics.timer('arcpy_call', call='ListDomains'):
+            domains = arcpy.da.ListDomains(sde_connection)
+        # Get all domain names, types, and coded values/ranges
+        for domain in domains:
+            domainType, domainName = intern_value(domain.domainType), intern_value(domain.name)
+            if domainType == 'CodedValue':
+                for code, description in domain.codedValues.items():
+                    row = (domainType, database, domainName, code, description)
+                    domain_data_store.append(row)
+            else: # Handles 'Range' domains
+                row = (domainType, database, domainName, None, None)
+                domain_data_store.append(row)
+    except Exception as e:
+        print(f"    ERROR processing domains in {database}: {e}")
+
+    return domain_data_store
+
+# Geodatabase system table reader for domains and domain usage
+# Expression returning GDB_ITEMS.Definition as text, by DBMS ('sqlite' is a local copy of the system tables)
+GDB_DEFINITION_SQL = {
+    'sqlserver': "CAST(i.Definition AS NVARCHAR(MAX))",
+    'postgresql': "XMLSERIALIZE(DOCUMENT i.Definition AS TEXT)",
+    'oracle': "XMLSERIALIZE(DOCUMENT i.Definition AS CLOB)",
+    'sqlite': "i.Definition",
+}
+# Where the system tables of a connection live when it is not listed in systemTableLocations
+DEFAULT_GDB_SYSTEM_TABLE_LOCATION = ('sde', 'sqlserver')
+
+_GDB_NUMERIC_FIELD_TYPES = {
+    'esriFieldTypeSmallInteger': int, 'esriFieldTypeInteger': int, 'esriFieldTypeBigInteger': int,
+    'esriFieldTypeSingle': float, 'esriFieldTypeDouble': float,
+}
+
+def _sde_sql_executor(sde_connection):
+    """Returns a function that runs a query through arcpy.ArcSDESQLExecute and always yields a list of rows."""
+    import arcpy
+
+    sde_executor = arcpy.ArcSDESQLExecute(sde_connection)
+
+    def execute(sql):
+        with metrics.timer('arcpy_call', call='ArcSDESQLExecute'):
+            result = sde_executor.execute(sql)
+        # ArcSDESQLExecute returns True for an empty result and a flat list for a single row
+        if not isinstance(result, list):
+            return []
+        if result and not isinstance(result[0], (list, tuple)):
+            return [result]
+        return result
+    return execute
+
+def _sqlite_sql_executor(database_path):
+    """Returns a function that runs a query against a SQLite copy of the system tables (used as a local fixture)."""
+    def execute(sql):
+        with closing(sqlite3.connect(database_path)) as connection:
+            return connection.execute(sql).fetchall()
+    return execute
+
+def _xml_children(element, name):
+    """Child elements by local name, ignoring XML namespaces."""
+    return [child for child in element if child.tag.rsplit('}', 1)[-1] == name]
+
+def _xml_text(element, name):
+    children = _xml_children(element, name)
+    return children[0].text if children else None
+
+def _read_gdb_system_tables(execute, database, owner="sde", definition_sql=GDB_DEFINITION_SQL['sqlserver']):
+    """
+    Reads domains, coded values and the field-to-domain bindings of every table and
+    feature class from the GDB_ITEMS system table in a single query, and returns
+    (domain rows, domain usage rows) shaped exactly like the arcpy path in GetDomainData.
+
+    execute runs a SQL statement and returns a list of rows. owner is the schema that
+    holds the geodatabase system tables ('sde' or 'dbo'), or None for an unqualified
+    fixture. definition_sql is the expression that returns the Definition XML as text
+    (see GDB_DEFINITION_SQL).
+    """
+    prefix = f"{owner}." if owner else ""
+    sql = (f"SELECT i.Name, i.Path, t.Name, {definition_sql} "
+           f"FROM {prefix}GDB_ITEMS i JOIN {prefix}GDB_ITEMTYPES t ON i.Type = t.UUID "
+           f"WHERE t.Name IN ('Coded Value Domain', 'Range Domain', 'Table', 'Feature Class', 'Feature Dataset')")
+
+    domain_data_store = []
+    domain_usage_data_store = []
+    items = [(name, path, item_type, definition) for name, path, item_type, definition in execute(sql)]
+    feature_datasets = {path.strip('\\').lower() for name, path, item_type, definition in items if item_type == 'Feature Dataset'}
+
+    for name, path, item_type, definition in items:
+        if not definition:
+            continue
+        root = ElementTree.fromstring(definition)
+
+        if item_type == 'Coded Value Domain':
+            convert = _GDB_NUMERIC_FIELD_TYPES.get(_xml_text(root, 'FieldType'), str)
+            for coded_values in _xml_children(root, 'CodedValues'):
+                for coded_value in _xml_children(coded_values, 'CodedValue'):
+                    code = _xml_text(coded_value, 'Code')
+                    domain_data_store.append(('CodedValue', database, name, convert(code) if code is not None else None,
+                                              _xml_text(coded_value, 'Name')))
+        elif item_type == 'Range Domain':
+            domain_data_store.append(('Range', database, name, None, None))
+
+        elif item_type in ('Table', 'Feature Class'):
+            # Path is \Name at the root, or \FeatureDataset\Name inside a feature dataset
+            segments = [segment for segment in path.split('\\') if segment]
+            if len(segments) == 1:
+                item = name
+            elif len(segments) == 2 and segments[0].lower() in feature_datasets:
+                item = f"{segments[0]}/{name.split('.')[-1]}"
+            else:
+                continue
+            for field_infos in _xml_children(root, 'GPFieldInfoExs'):
+                for field_info in _xml_children(field_infos, 'GPFieldInfoEx'):
+                    domain_name = _xml_text(field_info, 'DomainName')
+                    if domain_name:
+                        domain_usage_data_store.append((database, item, _xml_text(field_info, 'Name'), domain_name))
+
+    return domain_data_store, domain_usage_data_store
+
+def _collect_database_domains_from_system_tables(databaseFileDirectory, database, systemTableLocations=None):
+    """
+    Returns (domain rows, domain usage rows) for one geodatabase, read from its system
+    tables, or None if they could not be read. systemTableLocations maps connection file
+    names to (owner, DBMS) (see DEFAULT_GDB_SYSTEM_TABLE_LOCATION and GDB_DEFINITION_SQL).
+    A SQLite database in place of a connection file is read as a copy of the system
+    tables, with sqlite3 and no owner.
+    """
+    try:
+        sde_connection = os.path.join(databaseFileDirectory, database)
+        if os.path.splitext(database)[1].lower() in SQLITE_EXTENSIONS:
+            owner, dbms = (systemTableLocations or {}).get(database, (None, 'sqlite'))
+            execute = _sqlite_sql_executor(sde_connection)
+        else:
+            owner, dbms = (systemTableLocations or {}).get(database, DEFAULT_GDB_SYSTEM_TABLE_LOCATION)
+            execute = _sde_sql_executor(sde_connection)
+        return _read_gdb_system_tables(execute, database, owner, GDB_DEFINITION_SQL[dbms])
+    except Exception as e:
+        print(f"    ERROR reading geodatabase system tables in {database}: {e}")
+        return None
+
+# Catalog of a single enterprise geodatabase
+def _walk_database_catalog(databaseFileDirectory, database):
+    """
+    Walks one geodatabase once with arcpy.da.Walk and describes every dataset a single
+    time, fields included. The result is a plain dictionary (so it can be returned from
+    a worker process) holding the server name and one entry per collection and dataset,
+    in walk order. It feeds both the domain usage rows and the database content rows.
+
+    Entries are compact tuples of (collectionName, collectionType, datasetName,
+    datasetType, geometryType, path, domainFields) with the repeated type names
+    interned. Only fields that carry a domain are kept, as (fieldName, domainName).
+    """
+    import arcpy
+
+    sde_connection = f"{databaseFileDirectory}/{database}"
+    catalog = {'database': database, 'connection': sde_connection, 'serverName': "Unknown", 'entries': [], 'error': None}
+    try:
+        # Describe the connection to get properties.
+        with metrics.timer('arcpy_call', call='Describe'):
+            describeConnection = arcpy.Describe(sde_connection)
+        connection_props = describeConnection.connectionProperties
+
+        # For newer versions of ArcGIS Pro (e.g., 3.3+)
+        if hasattr(connection_props, 'server'):
+            catalog['serverName'] = connection_props.server
+        # For older versions (e.g., 3.2), fall back to the 'instance' property.
+        elif hasattr(connection_props, 'instance'):
+            instance_string = connection_props.instance
+            catalog['serverName'] = instance_string.split('\\')[0]
+
+        # Use arcpy.da.Walk to traverse the geodatabase.
+        for root, collections, tables in arcpy.da.Walk(sde_connection, datatype="Any", type="ALL"):
+            collectionName = None
+            if root != sde_connection:
+                # Collections are things like Feature Datasets
+                collectionName = os.path.basename(root)
+                with metrics.timer('arcpy_call', call='Describe'):
+                    collectionType = intern_value(arcpy.Describe(root).dataType)
+                catalog['entries'].append((collectionName, collectionType, None, collectionType, None, root, ()))
+            else:
+                collectionType = None
+
+            for table in tables:
+                datasetPath = os.path.join(root, table)
+                with metrics.timer('arcpy_dataset_describe', record=datasetPath):
+                    datasetDescription = arcpy.Describe(datasetPath) if arcpy.Exists(datasetPath) else None
+
+                datasetType = intern_value(datasetDescription.dataType) if datasetDescription else "POTENTIALLY CORRUPTED DATASET"
+                geometryType = None
+                if datasetDescription and str(datasetType).lower() == "featureclass":
+                    geometryType = intern_value(datasetDescription.shapeType)
+                domainFields = tuple((field.name, intern_value(field.domain)) for field in getattr(datasetDescription, 'fields', None) or []
+                                     if field.domain)
+
+                catalog['entries'].append((collectionName, collectionType, table, datasetType, geometryType, datasetPath, domainFields))
+
+    except Exception as e:
+        print(f"    ERROR walking the catalog of {database}: {e}")
+        catalog['error'] = str(e)
+    return catalog
+
+# Domain usage rows from a geodatabase catalog
+def _domain_usage_rows(catalog):
+    """
+    Yields a row for every field with a domain, on every table and feature class at
+    the root of the geodatabase or inside a feature dataset. Datasets inside a feature
+    dataset are named 'FeatureDataset/BaseName', as arcpy.ListFields addresses them.
+    """
+    database = catalog['database']
+    for collectionName, collectionType, datasetName, datasetType, geometryType, path, domainFields in catalog['entries']:
+        if datasetName is None or datasetType not in ('Table', 'FeatureClass'):
+            continue
+        if collectionName is None:
+            item = datasetName
+        elif collectionType == 'FeatureDataset':
+            item = f"{collectionName}/{datasetName.split('.')[-1]}"
+        else:
+            continue
+        for fieldName, domainName in domainFields:
+            yield (database, item, fieldName, domainName)
+
+# Database content rows from a geodatabase catalog
+def _database_content_rows(catalog):
+    """
+    Yields a row for the connection itself, each collection and every dataset, in table
+    field order (databaseRoot, databaseCollectionName, datasetName, datasetType,
+    geometryType, path, Datasource).
+    """
+    if catalog['error'] is not None:
+        return
+    database, serverName = catalog['database'], catalog['serverName']
+
+    # A row for the database connection itself.
+    yield (database, None, None, "Enterprise Geodatabase", None, catalog['connection'], f"{serverName}|")
+    for collectionName, collectionType, datasetName, datasetType, geometryType, path, domainFields in catalog['entries']:
+        yield (database, collectionName, datasetName, datasetType, geometryType, path, f"{serverName}|{datasetName or ''}")
+
+# Geodatabase Catalog Function
+def BuildGeodatabaseCatalog(databaseFileDirectory, databaseFileNames, databaseMaxWorkers=1):
+    """
+    Walks every database once and returns a catalog of its collections and datasets,
+    keyed by connection file name. Each dataset is described a single time, fields
+    included, and the catalog is shared by GetDomainData (domain usage) and
+    UpdateDatabaseContentTable (database content).
+    """
+    empty_catalog = {'database': None, 'connection': None, 'serverName': "Unknown", 'entries': [], 'error': "worker failed"}
+    catalogs = _map_databases(_walk_database_catalog, databaseFileDirectory, databaseFileNames, databaseMaxWorkers, empty_catalog)
+    return {database: dict(catalog, database=database) for database, catalog in zip(databaseFileNames, catalogs)}
+
+# Domain Data Function
+def GetDomainData(domainTable, databaseFileDirectory, domainUsageTable, databaseFileNames, databaseMaxWorkers=1, catalog=None, useSystemTables=False,
+                  systemTableLocations=None):
+    """
+    Connects to each database in the specified directory, retrieves all domain
+    and domain usage information, and writes it to two separate SQL tables.
+
+    With databaseMaxWorkers above 1, each database is collected in its own worker
+    process (arcpy is not thread-safe). Results are merged in databaseFileNames order.
+
+    Domain usage comes from the geodatabase catalog (see BuildGeodatabaseCatalog). Pass
+    a catalog built earlier in the run to avoid walking the databases again.
+
+    With useSystemTables, domains and domain usage are instead read from the geodatabase
+    system tables (GDB_ITEMS) with one query per database, found through
+    systemTableLocations (see _collect_database_domains_from_system_tables). The rows
+    are the same; use CheckDomainSystemTables to confirm that against the arcpy path.
+    Databases whose system tables cannot be read go through the arcpy path instead.
+    """
+
+    # Domain rows are streamed to the writer database by database.
+    if useSystemTables:
+        # Fast path: domains and domain usage from a bulk query of the system tables.
+        # Usage rows are kept aside while the domain table is written, then written second.
+        domain_usage_data_store = []
+
+        def _domain_rows():
+            fallback_databases = []
+            results = _map_databases(_collect_database_domains_from_system_tables, databaseFileDirectory, databaseFileNames,
+                                     databaseMaxWorkers, None, systemTableLocations=systemTableLocations)
+            for database, result in zip(databaseFileNames, results):
+                if result is None:
+                    fallback_databases.append(database)
+                    continue
+                domain_rows, domain_usage_rows = result
+                domain_usage_data_store.extend(domain_usage_rows)
+                yield from domain_rows
+
+            # Databases whose system tables could not be read are collected with arcpy
+            if fallback_databases:
+                print(f"    Reading domains with arcpy for {', '.join(fallback_databases)}")
+                for domain_rows in _map_databases(_collect_database_domains, databaseFileDirectory, fallback_databases, databaseMaxWorkers, []):
+                    yield from domain_rows
+                fallback_catalog = catalog if catalog is not None else BuildGeodatabaseCatalog(databaseFileDirectory, fallback_databases,
+                                                                                               databaseMaxWorkers)
+                for database in fallback_databases:
+                    domain_usage_data_store.extend(_domain_usage_rows(fallback_catalog[database]))
+    else:
+        # Collect domains for each database, in parallel when databaseMaxWorkers > 1
+        def _domain_rows():
+            for domain_rows in _map_databases(_collect_database_domains, databaseFileDirectory, databaseFileNames, databaseMaxWorkers, []):
+                yield from domain_rows
+
+        # Collect Domain Usage Information from the shared catalog
+        if catalog is None:
+            catalog = BuildGeodatabaseCatalog(databaseFileDirectory, databaseFileNames, databaseMaxWorkers)
+        domain_usage_data_store = (row for database in databaseFileNames for row in _domain_usage_rows(catalog[database]))
+
+    # Apply the differences to both tables
+    try:
+
+        # --- Populate the Domain Information Table ---
+        domainTableFields = ["DomainType", "DatabaseName", "DomainName", "Code", "Description"]
+        apply_table_delta(domainTable, domainTableFields, ["DatabaseName", "DomainName", "Code"], _domain_rows())
+
+        # --- Populate the Domain Usage Table ---
+        print(f"  Updating table: {domainUsageTable}")
+        domainUsageTableFields = ["DatabaseName", "TableName", "FieldName", "DomainName"]
+        apply_table_delta(domainUsageTable, domainUsageTableFields, ["DatabaseName", "TableName", "FieldName"], domain_usage_data_store)
+
+    except Exception as e:
+        print(f"\nFATAL ERROR during database operation: {e}")
+        print("Data was collected, but the database could not be updated. The batch in progress was rolled back; earlier batches were kept.")
+        raise
+
+# Domain System Table Consistency Check
+def CheckDomainSystemTables(databaseFileDirectory, databaseFileNames, catalog=None, systemTableLocations=None):
+    """
+    Compares the domain and domain usage rows read from the geodatabase system tables
+    with the rows the arcpy path produces, database by database, and prints any rows
+    found by only one of them. Returns True when every database matches and its
+    system tables could be read.
+    """
+    if catalog is None:
+        catalog = BuildGeodatabaseCatalog(databaseFileDirectory, databaseFileNames)
+
+    consistent = True
+    for database in databaseFileNames:
+        arcpy_rows = (_collect_database_domains(databaseFileDirectory, database), _domain_usage_rows(catalog[database]))
+        system_rows = _collect_database_domains_from_system_tables(databaseFileDirectory, database, systemTableLocations)
+        if system_rows is None:
+            consistent = False
+            print(f"  {database}: the system tables could not be read")
+            continue
+        for label, expected, actual in zip(("domain", "domain usage"), arcpy_rows, system_rows):
+            expected = Counter(tuple(normalize_value(value) for value in row) for row in expected)
+            actual = Counter(tuple(normalize_value(value) for value in row) for row in actual)
+            if expected != actual:
+                consistent = False
+                print(f"  {database}: {label} rows differ between arcpy and the system tables")
+                for row in sorted((expected - actual).elements(), key=str):
+                    print(f"    only from arcpy: {row}")
+                for row in sorted((actual - expected).elements(), key=str):
+                    print(f"    only from system tables: {row}")
+    return consistent
+
+def _apply_database_content(databaseInventoryTable, databaseFileNames, catalog):
+    """
+    Reconciles the database content table with the catalog. The whole table is
+    reconciled, so databases no longer in databaseFileNames lose their rows, but the
+    rows of a database whose catalog walk failed are kept.
+    """
+    rows_to_apply = (row for database in databaseFileNames for row in _database_content_rows(catalog[database]))
+    failed_databases = [database for database in databaseFileNames if catalog[database]['error'] is not None]
+    for database in failed_databases:
+        print(f"    Keeping the existing content rows of {database}: its catalog could not be walked.")
+
+    # The rows are streamed into the table as they are generated.
+    inventoryTableFieldList = ['databaseRoot', 'databaseCollectionName', 'datasetName', 'datasetType', 'geometryType', 'path', 'Datasource']
+    return apply_table_delta(databaseInventoryTable, inventoryTableFieldList, ['databaseRoot', 'path'], rows_to_apply,
+                             keep_field='databaseRoot', keep_values=failed_databases)
+
+# Database Content Function
+def UpdateDatabaseContentTable(databaseInventoryTable, databaseFileNames, databaseFileDirectory, databaseMaxWorkers=1, catalog=None):
+    """
+    Inventories the contents of enterprise geodatabases and populates a table with the findings.
+    This script is designed to be compatible with multiple ArcGIS Pro versions.
+
+    The rows come from the geodatabase catalog (see BuildGeodatabaseCatalog), which is
+    built here unless one from earlier in the run is passed in. With databaseMaxWorkers
+    above 1, each database is walked in its own worker process, and errors are contained
+    to the database that raised them: the rows of a database whose walk failed are left
+    as they are.
+    """
+    import arcpy
+
+    try:
+        # --- Step 1: Data Collection ---
+        # Rows come from the shared geodatabase catalog, already in table field order.
+        if catalog is None:
+            catalog = BuildGeodatabaseCatalog(databaseFileDirectory, databaseFileNames, databaseMaxWorkers)
+
+        # --- Step 2: Data Update ---
+        _apply_database_content(databaseInventoryTable, databaseFileNames, catalog)
+
+    except arcpy.ExecuteError as e:
+        print(f"An ArcPy error occurred: {e}")
+        raise
+    except Exception as e:
+        print(f"A general error occurred: {e}")
+        raise
+
@@ -0,0 +1,224 @@
+"""
+Run metrics: timers, counters and the slowest records of a run, exported as a JSON
+run report and a Prometheus textfile (for the node_exporter / windows_exporter
+textfile collector).
+
+Metrics are process-wide and thread-safe. Work done in worker processes is measured
+there and merged back by parallel.map_processes (see snapshot and merge).
+"""
+
+import cProfile
+import heapq
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Number of slowest records kept for each timer that records them
+SLOWEST_RECORDS = 20
+
+_lock = threading.Lock()
+_timers = {}    # (name, labels) -> [count, total seconds, max seconds]
+_counters = {}  # (name, labels) -> value
+_slowest = {}   # timer name -> min-heap of (seconds, record)
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def reset():
+    """Clears every timer, counter and slowest record list."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _slowest.clear()
+
+def count(name, value=1, **labels):
+    """Adds value to the counter name with the given labels."""
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, seconds, record=None, **labels):
+    """
+    Adds one timing of seconds to the timer name with the given labels. When record
+    is given (an item ID, service URL or dataset path), it competes for a place in
+    the slowest records of the timer.
+    """
+    key = (name, _label_key(labels))
+    with _lock:
+        timing = _timers.setdefault(key, [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = max(timing[2], seconds)
+        if record is not None:
+            _push_slowest(name, seconds, str(record))
+
+def _push_slowest(name, seconds, record):
+    heap = _slowest.setdefault(name, [])
+    if len(heap) < SLOWEST_RECORDS:
+        heapq.heappush(heap, (seconds, record))
+    elif seconds > heap[0][0]:
+        heapq.heapreplace(heap, (seconds, record))
+
+@contextmanager
+def timer(name, record=None, **labels):
+    """Times the body of a with statement into the timer name (see observe)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, record, **labels)
+
+def snapshot():
+    """The current metrics as plain, picklable data."""
+    with _lock:
+        return {'timers': [(name, labels, *timing) for (name, labels), timing in _timers.items()],
+                'counters': [(name, labels, value) for (name, labels), value in _counters.items()],
+                'slowest': {name: list(heap) for name, heap in _slowest.items()}}
+
+def merge(other):
+    """Adds a snapshot taken in another process to the metrics of this one."""
+    with _lock:
+        for name, labels, calls, total, longest in other['timers']:
+            timing = _timers.setdefault((name, tuple(map(tuple, labels))), [0, 0.0, 0.0])
+            timing[0] += calls
+            timing[1] += total
+            timing[2] = max(timing[2], longest)
+        for name, labels, value in other['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            _counters[key] = _counters.get(key, 0) + value
+        for name, heap in other['slowest'].items():
+            for seconds, record in heap:
+                _push_slowest(name, seconds, record)
+
+@contextmanager
+def profiled(name, directory):
+    """
+    Runs the body of a with statement under cProfile and writes the statistics to
+    directory/name.prof, when directory is set. cProfile only sees the thread that
+    enabled it, so work a stage hands to worker threads or processes is not included.
+    """
+    if not directory:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Python 3.12+ allows one active profiler per process; run unprofiled rather than fail
+        print(f"  WARNING: Could not profile stage '{name}' (use --sequential when profiling): {e}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, f"{name}.prof"))
+
+def print_slowest(limit=5):
+    """Prints the slowest records of each timer that keeps them."""
+    with _lock:
+        slowest = {name: sorted(heap, reverse=True)[:limit] for name, heap in _slowest.items()}
+    for name, records in sorted(slowest.items()):
+        print(f"Slowest {name}:")
+        for seconds, record in records:
+            print(f"  {seconds:8.2f}s  {record}")
+
+# Cache hit rates
+def cache_hit_rates():
+    """
+    Lookups, hits and hit rate of every cache counted as response_cache{cache, result},
+    by cache name. Every result other than 'miss' is a hit.
+    """
+    with _lock:
+        counters = list(_counters.items())
+    caches = {}
+    for (name, labels), value in counters:
+        labels = dict(labels)
+        if name != 'response_cache' or 'cache' not in labels:
+            continue
+        cache = caches.setdefault(labels['cache'], {'lookups': 0, 'hits': 0})
+        cache['lookups'] += value
+        if labels.get('result') != 'miss':
+            cache['hits'] += value
+    for cache in caches.values():
+        cache['hit_rate'] = round(cache['hits'] / cache['lookups'], 4) if cache['lookups'] else None
+    return dict(sorted(caches.items()))
+
+# Run report (JSON)
+def run_report(stage_report, started, finished):
+    """The run report as a JSON-ready dictionary."""
+    with _lock:
+        timers = [{'name': name, 'labels': dict(labels), 'count': calls, 'total_seconds': round(total, 6),
+                   'max_seconds': round(longest, 6)}
+                  for (name, labels), (calls, total, longest) in sorted(_timers.items())]
+        counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(_counters.items())]
+        slowest = {name: [{'record': record, 'seconds': round(seconds, 6)} for seconds, record in sorted(heap, reverse=True)]
+                   for name, heap in sorted(_slowest.items())}
+    return {
+        'started': datetime.fromtimestamp(started, timezone.utc).isoformat(),
+        'finished': datetime.fromtimestamp(finished, timezone.utc).isoformat(),
+        'duration_seconds': round(finished - started, 3),
+        'stages': {name: {'status': status, 'seconds': seconds, 'error': error}
+                   for name, (status, seconds, error) in stage_report.items()},
+        'timers': timers,
+        'counters': counters,
+        'slowest': slowest,
+        'caches': cache_hit_rates(),
+    }
+
+# Prometheus textfile
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{key}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+def prometheus_text(stage_report, finished, prefix="enterprise_inventory"):
+    """The metrics in the Prometheus text exposition format."""
+    lines = []
+
+    def _metric(name, metric_type, help_text, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+        for labels, value in samples:
+            lines.append(f"{prefix}_{name}{_prometheus_labels(labels)} {value}")
+
+    _metric("last_run_timestamp_seconds", "gauge", "Time the last run finished.", [((), round(finished, 3))])
+    _metric("stage_success", "gauge", "1 if the stage succeeded in the last run, 0 if it failed or was skipped.",
+            [((('stage', name),), int(status == 'succeeded')) for name, (status, seconds, error) in stage_report.items()])
+    _metric("stage_duration_seconds", "gauge", "Duration of the stage in the last run.",
+            [((('stage', name),), round(seconds, 3)) for name, (status, seconds, error) in stage_report.items()
+             if seconds is not None])
+
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+    for name in sorted({name for (name, labels), timing in timers}):
+        samples = [(labels, timing) for (timer_name, labels), timing in timers if timer_name == name]
+        _metric(f"{name}_seconds_total", "gauge", f"Total seconds spent in {name} in the last run.",
+                [(labels, round(total, 6)) for labels, (calls, total, longest) in samples])
+        _metric(f"{name}_count", "gauge", f"Number of timed {name} calls in the last run.",
+                [(labels, calls) for labels, (calls, total, longest) in samples])
+        _metric(f"{name}_max_seconds", "gauge", f"Longest single {name} call in the last run.",
+                [(labels, round(longest, 6)) for labels, (calls, total, longest) in samples])
+    for name in sorted({name for (name, labels), value in counters}):
+        _metric(f"{name}_total", "gauge", f"Number of {name.replace('_', ' ')} in the last run.",
+                [(labels, value) for (counter_name, labels), value in counters if counter_name == name])
+    hit_rates = cache_hit_rates()
+    if hit_rates:
+        _metric("cache_hit_ratio", "gauge", "Share of cache lookups served from the cache in the last run.",
+                [((('cache', cache),), rates['hit_rate']) for cache, rates in hit_rates.items()])
+    return "\n".join(lines) + "\n"
+
+def write_prometheus_textfile(path, stage_report, finished):
+    """Writes the Prometheus textfile atomically, so the collector never reads a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(prometheus_text(stage_report, finished))
+    os.replace(temp_path, path)
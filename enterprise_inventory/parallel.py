@@ -0,0 +1,115 @@
+"""Ordered, bounded execution of tasks on thread and process pools."""
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from . import metrics
+
+def _iter_ordered(executor, func, tasks, window):
+    """
+    Submits func(task) for each task while keeping at most window tasks in flight, and
+    yields (task, future) pairs in task order. tasks may be a generator; it is only
+    consumed as results are taken, so memory stays bounded by the window.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append((task, executor.submit(func, task)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+def ordered_map(func, tasks, max_workers):
+    """
+    Yields func(task) for every task, in task order, running up to max_workers tasks
+    at a time on a thread pool. With max_workers of 1 the tasks run serially.
+    """
+    if not max_workers or max_workers <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for task, future in _iter_ordered(executor, func, tasks, max_workers * 2):
+            yield future.result()
+
+class _ProducerFailure:
+    """Carries the exception a chain_concurrently producer raised to the consumer."""
+
+    def __init__(self, exception):
+        self.exception = exception
+
+def chain_concurrently(generator_funcs, buffer_size=5000):
+    """
+    Runs each generator function on its own thread and yields their items one generator
+    after another. Later generators work ahead while earlier ones are drained, but each
+    holds at most buffer_size items, so memory stays bounded.
+
+    An exception raised by a generator is raised to the consumer when it reaches that
+    generator's items, rather than ending its stream early. When the consumer stops,
+    by raising or closing the chain, the producer threads stop too.
+    """
+    finished = object()
+    stopped = threading.Event()
+    queues = [queue.Queue(maxsize=buffer_size) for _ in generator_funcs]
+
+    def _put(item_queue, item):
+        # Waits for room in the queue, giving up once the consumer has stopped
+        while not stopped.is_set():
+            try:
+                item_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(generator_func, item_queue):
+        try:
+            for item in generator_func():
+                if not _put(item_queue, item):
+                    return
+        except Exception as e:
+            _put(item_queue, _ProducerFailure(e))
+        else:
+            _put(item_queue, finished)
+
+    for generator_func, item_queue in zip(generator_funcs, queues):
+        threading.Thread(target=_produce, args=(generator_func, item_queue), daemon=True).start()
+    try:
+        for item_queue in queues:
+            while (item := item_queue.get()) is not finished:
+                if isinstance(item, _ProducerFailure):
+                    raise item.exception
+                yield item
+    finally:
+        stopped.set()
+
+def _measured_call(func, task):
+    """Runs func(task) in a worker process and returns its result with the metrics it recorded."""
+    metrics.reset()
+    return func(task), metrics.snapshot()
+
+def map_processes(func, tasks, max_workers, empty_result):
+    """
+    Calls func(task) for every task and yields the results in task order, using a pool
+    of up to max_workers worker processes when max_workers is above 1. Only a bounded
+    window of tasks is in flight, so finished results do not pile up ahead of the
+    consumer. A task whose worker fails outright is reported and contributes empty_result.
+    Metrics recorded in the worker processes are merged into this process.
+    """
+    if not max_workers or max_workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        for task, future in _iter_ordered(executor, partial(_measured_call, func), tasks, max_workers * 2):
+            try:
+                result, worker_metrics = future.result()
+                metrics.merge(worker_metrics)
+            except Exception as e:
+                print(f"    ERROR in worker process for {task}: {e}")
+                result = empty_result
+            yield result
@@ -0,0 +1,111 @@
+"""Cross-environment relationship index: join edges and orphan records across the inventory tables."""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from . import metrics
+from .state import save_json_state
+from .writer import read_table_rows
+
+RELATIONSHIP_INDEX_VERSION = 1
+
+# The relationships of the web application (CONFIG.relationships in app.js), in the same
+# order, as (from table, from field, to table, to field). Clients address them by position.
+RELATIONSHIPS = [
+    ("DATABASE_CONTENT", "Datasource",      "APRX_REST_DATA", "Datasource"),
+    ("DATABASE_CONTENT", "datasetName",     "DOMAIN_USAGE",   "TableName"),
+    ("DATABASE_CONTENT", "databaseRoot",    "DOMAIN_USAGE",   "DatabaseName"),
+    ("DATABASE_CONTENT", "databaseRoot",    "DOMAIN_TABLE",   "DatabaseName"),
+    ("APRX_REST_DATA",   "mapName",         "AGS_DATA",       "serviceName"),
+    ("AGS_DATA",         "serviceLayerURL", "AGO_DATA",       "LayerURL"),
+    ("AGS_DATA",         "serviceName",     "PBI_DATA",       "RESTServiceName"),
+    ("AGS_DATA",         "serviceURL",      "PBI_DATA",       "RESTServiceURL"),
+    ("AGS_DATA",         "serviceLayerURL", "PBI_DATA",       "RESTServiceLayerURL"),
+    ("AGO_DATA",         "LayerURL",        "AGO_DATA",       "ItemURL"),
+    ("DOMAIN_USAGE",     "DomainName",      "DOMAIN_TABLE",   "DomainName"),
+]
+
+def _join_value(value):
+    """The value a record joins on: case-insensitive, with empty values never joining anything."""
+    if value is None:
+        return None
+    value = str(value)
+    return value.lower() if value.strip() else None
+
+# Hash indexes of the join fields of one table
+def _index_table(table, fields):
+    """
+    Reads the join fields of one inventory table in a single pass and returns (every OID,
+    {field: {join value: [OIDs]}}).
+    """
+    oids = []
+    indexes = {field: defaultdict(list) for field in fields}
+    for oid, *values in read_table_rows(table, ["OID@"] + fields):
+        oids.append(oid)
+        for field, value in zip(fields, values):
+            value = _join_value(value)
+            if value is not None:
+                indexes[field][value].append(oid)
+    return oids, indexes
+
+# Relationship Index Function
+def BuildRelationshipIndex(tables, relationshipIndexFile):
+    """
+    Joins the inventory tables on the keys of every relationship the web application
+    traces, and writes the result to relationshipIndexFile as static JSON, so a trace is
+    a lookup instead of a scan of every table.
+
+    tables maps the web application's table IDs (DATABASE_CONTENT, AGS_DATA, ...) to
+    table paths; tables mapped to None are treated as empty. Each table is read once,
+    its join fields hashed, and each relationship joined on the smaller side of the two.
+    Values are compared case-insensitively, the way app.js compares them.
+
+    The file holds the relationships in app.js order, and for each one the join values
+    found on both sides as value -> [from OIDs, to OIDs]. It also lists the OIDs of the
+    orphan records of every table: records that no relationship connects to another
+    record, decided exactly as findOrphanRecords in app.js decides it. Returns the
+    orphan OIDs by table ID.
+    """
+    fields_by_table = defaultdict(list)
+    for from_table, from_field, to_table, to_field in RELATIONSHIPS:
+        for table_id, field in ((from_table, from_field), (to_table, to_field)):
+            if field not in fields_by_table[table_id]:
+                fields_by_table[table_id].append(field)
+
+    all_oids = {}
+    indexes = {}
+    for table_id, fields in fields_by_table.items():
+        if tables.get(table_id):
+            all_oids[table_id], table_indexes = _index_table(tables[table_id], fields)
+        else:
+            all_oids[table_id], table_indexes = [], {}
+        for field in fields:
+            indexes[(table_id, field)] = table_indexes.get(field, {})
+
+    edges = []
+    connected = defaultdict(set)
+    for from_table, from_field, to_table, to_field in RELATIONSHIPS:
+        from_index, to_index = indexes[(from_table, from_field)], indexes[(to_table, to_field)]
+        probe, build = (from_index, to_index) if len(from_index) <= len(to_index) else (to_index, from_index)
+        relationship_edges = {value: [from_index[value], to_index[value]] for value in probe if value in build}
+        edges.append(relationship_edges)
+        for from_oids, to_oids in relationship_edges.values():
+            connected[from_table].update(from_oids)
+            # app.js only follows a relationship from its 'from' side when a table is on both ends
+            if to_table != from_table:
+                connected[to_table].update(to_oids)
+        metrics.count('relationship_edges', sum(len(f) * len(t) for f, t in relationship_edges.values()),
+                      relationship=f"{from_table}.{from_field}->{to_table}.{to_field}")
+
+    orphans = {table_id: [oid for oid in oids if oid not in connected[table_id]] for table_id, oids in all_oids.items()}
+    save_json_state(relationshipIndexFile, {
+        'version': RELATIONSHIP_INDEX_VERSION,
+        'generated': datetime.now(timezone.utc).isoformat(),
+        'relationships': [{'from': from_table, 'fromField': from_field, 'to': to_table, 'toField': to_field}
+                          for from_table, from_field, to_table, to_field in RELATIONSHIPS],
+        'edges': edges,
+        'orphans': orphans,
+    })
+    print(f"  Relationship index: {sum(len(e) for e in edges)} join values across {len(RELATIONSHIPS)} relationships, "
+          f"{sum(len(o) for o in orphans.values())} orphan records.")
+    return orphans
@@ -0,0 +1,113 @@
+"""Persistent HTTP response cache with conditional revalidation, kept in a SQLite file between runs."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from . import metrics
+
+# Bumped whenever the stored values change shape; older caches are discarded
+RESPONSE_CACHE_SCHEMA = 1
+
+class ResponseCache:
+    """
+    Caches the parsed form of JSON responses by URL, so a response that has not changed
+    since the last run is neither parsed nor turned into rows again.
+
+    Each entry keeps the response's ETag and Last-Modified headers and a SHA-256 of its
+    body. A cached URL is requested with If-None-Match / If-Modified-Since, and a 304
+    reply is served from the cache; servers that send neither header are revalidated by
+    comparing the body hash instead. Entries are evicted least recently used first once
+    the stored values exceed max_bytes, when the cache is closed.
+
+    Every lookup is counted in the run metrics as response_cache{cache=name} with a
+    result of 'not_modified' (304), 'unchanged' (same body hash) or 'miss'.
+    The cache is shared by worker threads; use close() (or a with statement) to save it.
+    """
+
+    def __init__(self, path, max_bytes, name):
+        self._name = name
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] != RESPONSE_CACHE_SCHEMA:
+            self._connection.execute("DROP TABLE IF EXISTS responses")
+            self._connection.execute(f"PRAGMA user_version = {RESPONSE_CACHE_SCHEMA}")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                                 "content_hash TEXT, value TEXT, size INTEGER, last_used REAL)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._connection.execute("SELECT etag, last_modified, content_hash, value FROM responses WHERE url = ?",
+                                            (url,)).fetchone()
+
+    def _touch(self, url):
+        with self._lock:
+            self._connection.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+
+    def _store(self, url, etag, last_modified, content_hash, value):
+        value = json.dumps(value)
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     (url, etag, last_modified, content_hash, value, len(value), time.time()))
+
+    def get_parsed(self, session, url, timeout, parse):
+        """
+        GETs url through session and returns (status code, parse(response JSON)), using
+        the cached value when the response has not changed. parse may return None for
+        responses that should not be cached (error payloads); None is returned as is.
+        """
+        cached = self._lookup(url)
+        headers = {}
+        if cached:
+            etag, last_modified, content_hash, value = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = session.get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and cached:
+            self._touch(url)
+            metrics.count('response_cache', cache=self._name, result='not_modified')
+            return 200, json.loads(cached[3])
+        if response.status_code != 200:
+            return response.status_code, None
+
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if cached and cached[2] == body_hash:
+            self._touch(url)
+            metrics.count('response_cache', cache=self._name, result='unchanged')
+            return 200, json.loads(cached[3])
+
+        metrics.count('response_cache', cache=self._name, result='miss')
+        value = parse(response.json())
+        if value is not None:
+            self._store(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), body_hash, value)
+        return 200, value
+
+    def close(self):
+        """Evicts least recently used entries beyond max_bytes and saves the cache."""
+        with self._lock:
+            total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self._max_bytes:
+                evicted = []
+                for url, size in self._connection.execute("SELECT url, size FROM responses ORDER BY last_used").fetchall():
+                    if total <= self._max_bytes:
+                        break
+                    evicted.append((url,))
+                    total -= size
+                self._connection.executemany("DELETE FROM responses WHERE url = ?", evicted)
+                metrics.count('response_cache_evictions', len(evicted), cache=self._name)
+            self._connection.commit()
+            self._connection.close()
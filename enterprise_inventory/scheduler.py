@@ -0,0 +1,201 @@
+"""Dependency-aware stage scheduler and command line entry point."""
+
+import argparse
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import config, metrics
+from .ago import GetAGODataSources
+from .ags import GetArcGISServerData
+from .aprx import GetArcGISProRESTData
+from .geodatabase import BuildGeodatabaseCatalog, CheckDomainSystemTables, GetDomainData, UpdateDatabaseContentTable
+from .relationships import BuildRelationshipIndex
+from .snapshot import ExportInventorySnapshot
+from .state import save_json_state
+from .writer import create_sqlite_tables
+
+# PowerBI Data is handled elsewhere, but included as a comment here as a reminder
+#def UpdatePBIDataSources():
+#    pass
+
+# Stage scheduler
+# The stages that write inventory tables, which the relationship index and the snapshot are built from
+_TABLE_STAGES = ('ago', 'ags', 'domains', 'aprx', 'content')
+
+def _pipeline_stages():
+    """
+    The stages of a run as name -> (label, dependencies, follows, function). Each function
+    receives the results of the stages run so far, keyed by stage name. A stage also
+    runs after, and whenever, any stage it follows runs (see RunStages): the
+    relationship index and the snapshot are rebuilt by every run that writes a table,
+    without selecting them pulling the collection stages in. Stages run
+    alongside each other; arcpy is not thread-safe, so the stages that use it take
+    arcpy_lock around each arcpy call (one database, project or table read or edit
+    batch at a time), which leaves the pure HTTP stages (AGO and ArcGIS Server) free
+    to overlap them.
+    """
+    stages = {
+        'ago': ("Updating AGO Data Sources...", (), (),
+                lambda results: GetAGODataSources(config.ago_url, config.agoInventoryTable, *config.ago_credentials(),
+                                                  config.agoMaxWorkers, config.agoStateFile, config.agoFolderCacheHours,
+                                                  config.agoExpandWebMaps)),
+        'ags': ("Updating ArcGIS Server Data...", (), (),
+                lambda results: GetArcGISServerData(config.arcGISServerInventoryTable, config.ags_Base_URLs, *config.ags_credentials(),
+                                                    config.agsMaxWorkersPerHost, config.agsRequestTimeout, config.agsBulkReports,
+                                                    config.agsResponseCacheFile, config.agsResponseCacheMegabytes)),
+        'catalog': ("Walking Geodatabase Catalogs...", (), (),
+                    lambda results: BuildGeodatabaseCatalog(config.databaseFileDirectory, config.databaseFileNames, config.databaseMaxWorkers)),
+        'domains': ("Updating Domain Data...", ('catalog',), (),
+                    lambda results: GetDomainData(config.domainTable, config.databaseFileDirectory, config.domainUsageTable,
+                                                  config.databaseFileNames, config.databaseMaxWorkers, results['catalog'],
+                                                  config.useGdbSystemTables, config.gdbSystemTableLocations)),
+        'aprx': ("Updating ArcGIS Pro REST Data...", (), (),
+                 lambda results: GetArcGISProRESTData(config.restAprxDirectory, config.restAprxDatabaseTable,
+                                                      config.restAprxManifestFile, config.aprxMaxWorkers)),
+        'content': ("Updating Database Content...", ('catalog',), (),
+                    lambda results: UpdateDatabaseContentTable(config.databaseInventoryTable, config.databaseFileNames,
+                                                               config.databaseFileDirectory, config.databaseMaxWorkers,
+                                                               results['catalog'])),
+        'relationships': ("Building Relationship Index...", (), _TABLE_STAGES,
+                          lambda results: BuildRelationshipIndex(_web_application_tables(), config.relationshipIndexFile)),
+        'snapshot': ("Exporting Inventory Snapshot...", (), _TABLE_STAGES,
+                     lambda results: ExportInventorySnapshot(_web_application_tables(), config.snapshotFile)),
+    }
+    if not config.relationshipIndexFile:
+        del stages['relationships']
+    if not config.snapshotFile:
+        del stages['snapshot']
+    return stages
+
+def _web_application_tables():
+    """The inventory tables by web application table ID (CONFIG.layers in app.js)."""
+    return {
+        'DATABASE_CONTENT': config.databaseInventoryTable,
+        'APRX_REST_DATA': config.restAprxDatabaseTable,
+        'AGS_DATA': config.arcGISServerInventoryTable,
+        'AGO_DATA': config.agoInventoryTable,
+        'DOMAIN_USAGE': config.domainUsageTable,
+        'DOMAIN_TABLE': config.domainTable,
+        'PBI_DATA': config.pbiDataTable,
+    }
+
+def _run_stage(name, stage, results, profile_directory=None):
+    """
+    Runs one stage, under cProfile if profile_directory is set, and returns
+    (result, seconds spent running).
+    """
+    label, dependencies, follows, func = stage
+    print(label)
+    start = time.perf_counter()
+    with metrics.profiled(name, profile_directory):
+        result = func(results)
+    return result, time.perf_counter() - start
+
+def RunStages(stages, selected=None, concurrent=True, profile_directory=None):
+    """
+    Runs the selected stages (all of them when selected is empty), plus the stages they
+    depend on, starting each one as soon as its dependencies have succeeded. With
+    concurrent set to False the stages run one at a time in definition order.
+
+    stages maps names to (label, dependencies, follows, function). follows only orders:
+    a stage that follows others is added to the run whenever one of them runs, and
+    starts once those in the run have finished, whatever their outcome, but running it
+    does not bring them in.
+
+    A stage that raises is recorded as failed and the stages that depend on it are
+    skipped; independent stages carry on. Returns name -> (status, seconds, error) in
+    definition order, with status one of 'succeeded', 'failed' or 'skipped'.
+
+    With profile_directory set, each stage writes a cProfile dump named after it there.
+    """
+    wanted = set()
+    pending = list(selected or stages)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(stages[name][1])
+        if not pending:
+            # Stages following one that runs are brought up to date after it
+            pending = [name for name, stage in stages.items() if name not in wanted and wanted.intersection(stage[2])]
+    order = [name for name in stages if name in wanted]
+
+    results = {}
+    report = {}
+
+    def _finish(name, future):
+        try:
+            results[name], seconds = future.result()
+            report[name] = ('succeeded', seconds, None)
+        except Exception as e:
+            print(f"ERROR: Stage '{name}' failed: {e}")
+            report[name] = ('failed', None, f"{type(e).__name__}: {e}")
+
+    with ThreadPoolExecutor(max_workers=len(order) if concurrent else 1) as executor:
+        waiting = list(order)
+        running = {}
+        while waiting or running:
+            for name in list(waiting):
+                dependencies = stages[name][1]
+                followed = [stage for stage in stages[name][2] if stage in wanted]
+                if any(report.get(dependency, ('',))[0] in ('failed', 'skipped') for dependency in dependencies):
+                    print(f"Skipping stage '{name}': a stage it depends on did not succeed.")
+                    report[name] = ('skipped', None, None)
+                    waiting.remove(name)
+                elif all(dependency in results for dependency in dependencies) and all(stage in report for stage in followed):
+                    running[executor.submit(_run_stage, name, stages[name], dict(results), profile_directory)] = name
+                    waiting.remove(name)
+                elif not concurrent:
+                    break
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                _finish(running.pop(future), future)
+
+    return {name: report[name] for name in order}
+
+def _print_stage_report(report):
+    print("Stage summary:")
+    for name, (status, seconds, error) in report.items():
+        duration = f"{seconds:8.1f}s" if seconds is not None else " " * 9
+        print(f"  {name:<10} {status:<10} {duration}  {error or ''}".rstrip())
+
+# Main Function
+def main(argv=None):
+    stages = _pipeline_stages()
+    parser = argparse.ArgumentParser(description="Populate the Enterprise Inventory tables.")
+    parser.add_argument('--stage', dest='stages', action='append', choices=list(stages),
+                        help="Run only this stage (and the stages it depends on; the relationship index and the snapshot are "
+                             "rebuilt after any stage that writes a table). Repeat to run several; all stages run by default.")
+    parser.add_argument('--sequential', action='store_true', help="Run the stages one at a time instead of overlapping them.")
+    parser.add_argument('--profile', metavar='DIR', default=config.profileDirectory,
+                        help="Write a cProfile dump of each stage to DIR (best combined with --sequential).")
+    parser.add_argument('--check-domain-system-tables', action='store_true',
+                        help="Compare the domains read from the geodatabase system tables with arcpy's, database by database, and exit.")
+    args = parser.parse_args(argv)
+
+    if args.check_domain_system_tables:
+        consistent = CheckDomainSystemTables(config.databaseFileDirectory, config.databaseFileNames,
+                                             systemTableLocations=config.gdbSystemTableLocations)
+        print("The system tables match arcpy." if consistent else "The system tables do not match arcpy; leave useGdbSystemTables off.")
+        return 0 if consistent else 1
+
+    metrics.reset()
+    create_sqlite_tables(_web_application_tables())
+    started = time.time()
+    report = RunStages(stages, args.stages, concurrent=not args.sequential, profile_directory=args.profile)
+    finished = time.time()
+
+    _print_stage_report(report)
+    metrics.print_slowest()
+    for cache, rates in metrics.cache_hit_rates().items():
+        print(f"Cache {cache}: {rates['hits']} of {rates['lookups']} lookups served from the cache ({rates['hit_rate']:.0%}).")
+    try:
+        if config.runReportFile:
+            save_json_state(config.runReportFile, metrics.run_report(report, started, finished))
+        if config.prometheusTextFile:
+            metrics.write_prometheus_textfile(config.prometheusTextFile, report, finished)
+    except OSError as e:
+        print(f"WARNING: Could not write the run report: {e}")
+    return 0 if all(status == 'succeeded' for status, seconds, error in report.values()) else 1
@@ -0,0 +1,77 @@
+"""Field definitions of the inventory tables, as shipped in EnterpriseInventorySchema.gdb.zip."""
+
+# Table ID (CONFIG.layers in app.js) -> fields as (name, type, length, alias) in table order,
+# after the OBJECTID field every table has. length is None for non-text fields.
+INVENTORY_SCHEMA = {
+    'AGO_DATA': [
+        ('ItemID', 'String', 255, None),
+        ('ItemName', 'String', 255, None),
+        ('AGOAccount', 'String', 255, None),
+        ('AGOAccountFolder', 'String', 255, None),
+        ('LayerName', 'String', 255, None),
+        ('LayerURL', 'String', 2000, None),
+        ('ItemType', 'String', 255, None),
+        ('ItemURL', 'String', 255, None),
+    ],
+    'AGS_DATA': [
+        ('serviceURL', 'String', 255, 'Service URL'),
+        ('serviceName', 'String', 255, 'Service Name'),
+        ('serviceType', 'String', 255, 'Service Type'),
+        ('layerName', 'String', 255, 'Layer Name'),
+        ('layerType', 'String', 255, 'Layer Type'),
+        ('layerID', 'Integer', None, 'Layer ID'),
+        ('serviceLayerURL', 'String', 255, 'Service Layer URL'),
+        ('serviceStatus', 'String', 255, 'Service Status'),
+    ],
+    'DATABASE_CONTENT': [
+        ('databaseRoot', 'String', 255, None),
+        ('databaseCollectionName', 'String', 255, None),
+        ('datasetName', 'String', 255, None),
+        ('datasetType', 'String', 255, None),
+        ('geometryType', 'String', 255, None),
+        ('path', 'String', 255, None),
+        ('Datasource', 'String', 255, None),
+    ],
+    'DOMAIN_TABLE': [
+        ('DatabaseName', 'String', 255, None),
+        ('DomainName', 'String', 255, None),
+        ('DomainType', 'String', 255, None),
+        ('Code', 'String', 255, None),
+        ('Description', 'String', 255, None),
+    ],
+    'DOMAIN_USAGE': [
+        ('DatabaseName', 'String', 255, None),
+        ('TableName', 'String', 255, None),
+        ('FieldName', 'String', 255, None),
+        ('DomainName', 'String', 255, None),
+    ],
+    'PBI_DATA': [
+        ('Workspace', 'String', 255, None),
+        ('Report', 'String', 255, None),
+        ('DataSourceType', 'String', 50, None),
+        ('Filepath', 'String', 255, None),
+        ('WebURL', 'String', 255, None),
+        ('Server', 'String', 50, None),
+        ('DatabaseName', 'String', 50, None),
+        ('LastEdit', 'Date', None, None),
+        ('AzureAccount', 'String', 50, None),
+        ('AzureDomain', 'String', 50, None),
+        ('emailAddress', 'String', 50, None),
+        ('SFclassInfo', 'String', 50, None),
+        ('SFloginServer', 'String', 50, None),
+        ('RESTServiceName', 'String', 255, 'REST Service Name'),
+        ('RESTServiceLayerID', 'Integer', None, 'REST Service LayerID'),
+        ('RESTServiceURL', 'String', 255, 'REST Service URL'),
+        ('RESTServiceLayerURL', 'String', 255, 'REST Service Layer URL'),
+    ],
+    'APRX_REST_DATA': [
+        ('mapName', 'String', 255, None),
+        ('layerName', 'String', 255, None),
+        ('layerID', 'SmallInteger', None, None),
+        ('path_windows', 'String', 255, None),
+        ('ServerName', 'String', 255, None),
+        ('DatabaseName', 'String', 255, None),
+        ('DatasetName', 'String', 255, None),
+        ('Datasource', 'String', 255, None),
+    ],
+}
@@ -0,0 +1,83 @@
+"""Prebuilt trigram index of the fields the web application's global search looks in."""
+
+from collections import defaultdict
+
+SEARCH_INDEX_FORMAT = 1
+# Length of the n-grams indexed, in characters (code points)
+SEARCH_GRAM_LENGTH = 3
+
+# The fields the web application searches (CONFIG.searchableFields in app.js), by table ID
+SEARCHABLE_FIELDS = {
+    'DATABASE_CONTENT': ['datasetName', 'Datasource'],
+    'APRX_REST_DATA':   ['DatasetName', 'mapName', 'path_windows'],
+    'AGS_DATA':         ['serviceURL'],
+    'AGO_DATA':         ['ItemName', 'LayerURL'],
+    'DOMAIN_USAGE':     ['DomainName'],
+    'DOMAIN_TABLE':     ['DomainName'],
+    'PBI_DATA':         ['Report', 'Workspace', 'RESTServiceURL', 'RESTServiceName', 'WebURL'],
+}
+
+def _grams(value, gram_strings):
+    """
+    The distinct lowercase n-grams of one value, as a tuple. gram_strings ({gram: gram})
+    hands out one string per distinct n-gram, so they are not stored again for every value.
+    """
+    value = str(value).lower()
+    return tuple({gram_strings.setdefault(gram, gram)
+                  for gram in (value[i:i + SEARCH_GRAM_LENGTH] for i in range(len(value) - SEARCH_GRAM_LENGTH + 1))})
+
+def _delta_encode(oids):
+    """Sorted OIDs as the first OID followed by the gaps between them, which compress well."""
+    previous = 0
+    encoded = []
+    for oid in oids:
+        encoded.append(oid - previous)
+        previous = oid
+    return encoded
+
+# Search Index Function
+def build_search_index(snapshot_tables, dictionary):
+    """
+    Builds the global search index from the tables of an inventory snapshot (see
+    snapshot.ExportInventorySnapshot), where dictionary is the snapshot's string list.
+
+    For each table, every n-gram of the lowercased values of its searchable fields maps
+    to the sorted, delta-encoded OIDs of the records containing it. A keyword at least
+    SEARCH_GRAM_LENGTH long can only match a record holding all of its n-grams, so the
+    web application intersects those lists and checks only the records left, keeping
+    the substring match of a full scan. Tables without an OID field are left out and
+    are scanned. Returns the index as a dictionary.
+    """
+    index_tables = {}
+    gram_strings = {}
+    for table_id, table in snapshot_tables.items():
+        field_names = [field['name'] for field in table['fields']]
+        oid_index = next((i for i, field in enumerate(table['fields']) if field['type'] == 'esriFieldTypeOID'), None)
+        fields = [field for field in SEARCHABLE_FIELDS.get(table_id, []) if field in field_names]
+        if oid_index is None or not fields:
+            continue
+
+        postings = defaultdict(list)
+        # Kept for one table at a time: strings are seldom shared between tables
+        grams_by_string = {}
+        columns = [table['columns'][field_names.index(field)] for field in fields]
+        for row, oid in enumerate(table['columns'][oid_index]['values']):
+            record_grams = set()
+            for column in columns:
+                value = column['values'][row]
+                if value is None:
+                    continue
+                if column['encoding'] == 'dictionary':
+                    # Repeated strings (hosts, services, paths) are split into n-grams once
+                    if value not in grams_by_string:
+                        grams_by_string[value] = _grams(dictionary[value], gram_strings)
+                    record_grams.update(grams_by_string[value])
+                else:
+                    record_grams.update(_grams(value, gram_strings))
+            for gram in record_grams:
+                postings[gram].append(oid)
+
+        # Rows are in OID order, so every list is already sorted
+        index_tables[table_id] = {'fields': fields,
+                                  'grams': {gram: _delta_encode(oids) for gram, oids in sorted(postings.items())}}
+    return {'format': SEARCH_INDEX_FORMAT, 'gramLength': SEARCH_GRAM_LENGTH, 'tables': index_tables}
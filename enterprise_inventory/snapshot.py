@@ -0,0 +1,184 @@
+"""Compact, versioned snapshot of the inventory tables for the web application."""
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from . import metrics
+from .search_index import build_search_index
+from .state import file_sha256, load_json_state, save_json_state
+from .writer import list_table_fields, read_table_rows
+
+SNAPSHOT_FORMAT = 1
+
+# Field types that are not attribute values and are left out of the snapshot
+_SKIPPED_FIELD_TYPES = ('Geometry', 'Blob', 'Raster')
+
+# Values per piece when a column is written out, so no column is ever one string in memory
+JSON_SLICE_LENGTH = 10000
+
+_JSON_OPTIONS = {'separators': (',', ':'), 'ensure_ascii': False, 'default': str}
+
+def snapshot_manifest_file(snapshotFile):
+    """Path of the small manifest published next to the snapshot: version, content hash and file name."""
+    return f"{os.path.splitext(os.path.splitext(snapshotFile)[0])[0]}.manifest.json"
+
+def search_index_file(snapshotFile):
+    """Path of the global search index published next to the snapshot."""
+    return f"{os.path.splitext(os.path.splitext(snapshotFile)[0])[0]}.search.json.gz"
+
+def _write_gzip(path, chunks):
+    """
+    Writes the text chunks gzip-compressed and atomically as they come, with no timestamp
+    so equal content gives equal bytes.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with gzip.GzipFile(temp_path, 'wb', compresslevel=9, mtime=0) as f:
+        for chunk in chunks:
+            f.write(chunk.encode('utf-8'))
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+def _snapshot_value(value):
+    """Dates as epoch milliseconds, like the REST API returns them; everything else as is."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    return value
+
+# Column-oriented, dictionary-encoded copy of one table
+def _read_table_columns(table, dictionary):
+    """
+    Reads one table in OID order and returns its field definitions and one list per field.
+    Text columns hold indexes into dictionary, a shared {string: index} that grows as new
+    values are found, so every repeated string (hosts, owners, types, paths) is stored once.
+    Other columns (OIDs, integers, dates) hold their values, with None for nulls. The
+    columns are filled from the cursor, so the table's rows are never all held at once.
+    """
+    fields = [field for field in list_table_fields(table) if field.type not in _SKIPPED_FIELD_TYPES]
+    encoders = [(lambda value: None if value is None else dictionary.setdefault(value, len(dictionary)))
+                if field.type in ('String', 'GUID', 'GlobalID') else _snapshot_value for field in fields]
+    values = [[] for _ in fields]
+    row_count = 0
+    for row in read_table_rows(table, [field.name for field in fields]):
+        for column_values, encode, value in zip(values, encoders, row):
+            column_values.append(encode(value))
+        row_count += 1
+
+    oid_index = next((i for i, field in enumerate(fields) if field.type == 'OID'), None)
+    if oid_index is not None:
+        oids = values[oid_index]
+        if any(oids[i] > oids[i + 1] for i in range(row_count - 1)):
+            order = sorted(range(row_count), key=oids.__getitem__)
+            for column_values in values:
+                column_values[:] = [column_values[i] for i in order]
+
+    columns = [{'encoding': 'dictionary' if field.type in ('String', 'GUID', 'GlobalID') else 'plain', 'values': column_values}
+               for field, column_values in zip(fields, values)]
+    definitions = [{'name': field.name, 'alias': field.aliasName or field.name, 'type': f"esriFieldType{field.type}"}
+                   for field in fields]
+    return definitions, columns, row_count
+
+def _json_array_chunks(values):
+    """Yields a list as JSON text, JSON_SLICE_LENGTH values at a time."""
+    yield '['
+    for start in range(0, len(values), JSON_SLICE_LENGTH):
+        if start:
+            yield ','
+        yield json.dumps(values[start:start + JSON_SLICE_LENGTH], **_JSON_OPTIONS)[1:-1]
+    yield ']'
+
+def _snapshot_content_chunks(dictionary, snapshot_tables, opening='{'):
+    """
+    Yields {"dictionary": [...], "tables": {...}} as JSON text a slice of a column at a
+    time, the same text json.dumps gives, starting with opening instead of the first brace.
+    """
+    yield f'{opening}"dictionary":'
+    yield from _json_array_chunks(dictionary)
+    yield ',"tables":{'
+    for i, (table_id, table) in enumerate(snapshot_tables.items()):
+        yield f'{"," if i else ""}{json.dumps(table_id, **_JSON_OPTIONS)}:{{"fields":{json.dumps(table["fields"], **_JSON_OPTIONS)},' \
+              f'"rowCount":{table["rowCount"]},"columns":['
+        for j, column in enumerate(table['columns']):
+            yield f'{"," if j else ""}{{"encoding":{json.dumps(column["encoding"])},"values":'
+            yield from _json_array_chunks(column['values'])
+            yield '}'
+        yield ']}'
+    yield '}}'
+
+# Snapshot Export Function
+def ExportInventorySnapshot(tables, snapshotFile):
+    """
+    Writes every inventory table to one gzip-compressed snapshot file, so the web
+    application can load all of its data with a single cacheable download instead of
+    querying each table of the map service (and running into its maxRecordCount).
+
+    tables maps the web application's table IDs (DATABASE_CONTENT, AGS_DATA, ...) to table
+    paths; tables mapped to None are left out. Each table is stored column by column, and
+    text columns are dictionary-encoded against one string dictionary shared by all tables.
+
+    The content hash covers the dictionary and the tables. A manifest next to the
+    snapshot (see snapshot_manifest_file) holds the hash, the snapshot file name and a
+    version that goes up by one each time the content changes; when the hash matches
+    the previous run nothing is rewritten, so clients keep their cached copy. Returns
+    the manifest.
+
+    The global search index (see search_index.build_search_index) is written next to the
+    snapshot (see search_index_file) and versioned with it: it carries the snapshot's
+    hash, the manifest lists its file and hash, and either one changing makes a new version.
+    """
+    dictionary = {}
+    snapshot_tables = {}
+    for table_id, table in tables.items():
+        if not table:
+            continue
+        fields, columns, row_count = _read_table_columns(table, dictionary)
+        snapshot_tables[table_id] = {'fields': fields, 'rowCount': row_count, 'columns': columns}
+
+    strings = list(dictionary)
+    # Hashed as it is encoded; the file is only written, in a second pass, if the hash changed
+    hasher = hashlib.sha256()
+    for chunk in _snapshot_content_chunks(strings, snapshot_tables):
+        hasher.update(chunk.encode('utf-8'))
+    content_hash = hasher.hexdigest()
+    with metrics.timer('search_index'):
+        search_index = dict(build_search_index(snapshot_tables, strings), snapshotHash=content_hash)
+    search_content = json.dumps(search_index, separators=(',', ':'), ensure_ascii=False)
+    search_hash = hashlib.sha256(search_content.encode('utf-8')).hexdigest()
+    search_file = search_index_file(snapshotFile)
+
+    manifest_file = snapshot_manifest_file(snapshotFile)
+    previous = load_json_state(manifest_file)
+    if (previous.get('hash') == content_hash and previous.get('format') == SNAPSHOT_FORMAT and os.path.exists(snapshotFile)
+            and previous.get('searchIndex', {}).get('hash') == search_hash and os.path.exists(search_file)):
+        print(f"  Inventory snapshot unchanged (version {previous['version']}).")
+        return previous
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'version': previous.get('version', 0) + 1,
+        'hash': content_hash,
+        'generated': datetime.now(timezone.utc).isoformat(),
+        'file': os.path.basename(snapshotFile),
+        'tables': {table_id: snapshot_table['rowCount'] for table_id, snapshot_table in snapshot_tables.items()},
+        'searchIndex': {'file': os.path.basename(search_file), 'hash': search_hash},
+    }
+    # The header repeats the version and hash, so a snapshot can be checked on its own
+    header = json.dumps({key: manifest[key] for key in ('format', 'version', 'hash', 'generated')}, separators=(',', ':'))
+    manifest['size'] = _write_gzip(snapshotFile, _snapshot_content_chunks(strings, snapshot_tables, opening=f"{header[:-1]},"))
+    manifest['searchIndex']['size'] = _write_gzip(search_file, [search_content])
+    # Hashes of the bytes as written, so a server can tell a file from a newer run than the manifest
+    manifest['fileHash'] = file_sha256(snapshotFile)
+    manifest['searchIndex']['fileHash'] = file_sha256(search_file)
+    save_json_state(manifest_file, manifest)
+
+    metrics.count('snapshot_bytes', manifest['size'])
+    metrics.count('search_index_bytes', manifest['searchIndex']['size'])
+    print(f"  Inventory snapshot version {manifest['version']}: {sum(manifest['tables'].values())} rows, "
+          f"{len(dictionary)} distinct strings, {manifest['size']} bytes compressed; "
+          f"search index {manifest['searchIndex']['size']} bytes.")
+    return manifest
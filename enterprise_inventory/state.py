@@ -0,0 +1,33 @@
+"""State kept between runs: JSON state files and content hashes."""
+
+import hashlib
+import json
+import os
+
+def load_json_state(path):
+    """Load a JSON state file, returning an empty dictionary if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"  WARNING: Could not read state file {path}, starting from an empty state: {e}")
+        return {}
+
+def save_json_state(path, state):
+    """Write a JSON state file atomically so an interrupted run never leaves a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+def file_sha256(path):
+    """Content hash of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,368 @@
+"""
+Delta writer for the inventory tables, and the table backends it reads and writes
+through: geodatabase tables with arcpy, or tables in a local SQLite database with
+sqlite3. arcpy is imported on first use.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from collections import deque, namedtuple
+from datetime import datetime
+
+from . import metrics
+from .schema import INVENTORY_SCHEMA
+
+# Delta writer for the inventory tables
+WRITE_BATCH_SIZE = 5000
+# Inserts from this many rows up are bulk loaded into geodatabase tables from an array
+BULK_INSERT_MINIMUM = 1000
+
+# arcpy is not thread-safe: stages that run concurrently take this lock around their arcpy work
+arcpy_lock = threading.RLock()
+
+# Database extensions of table paths that are written with sqlite3 instead of arcpy
+SQLITE_EXTENSIONS = ('.sqlite', '.db')
+
+TableField = namedtuple('TableField', ['name', 'type', 'length', 'aliasName'])
+
+def normalize_value(value):
+    """Normalize a value for comparison with what the table returns (text fields hand back strings)."""
+    return None if value is None else str(value)
+
+def intern_value(value):
+    """Interns strings that repeat across many rows (types, owners, hosts), so each distinct value is stored once."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _scope_where_clauses(scope_field, scope_values, chunk_size=200):
+    """SQL where clauses selecting rows whose scope_field is in scope_values, in chunks to keep each clause short."""
+    values = sorted(scope_values)
+    for start in range(0, len(values), chunk_size):
+        quoted = ", ".join(str(value) if isinstance(value, int) else "'" + str(value).replace("'", "''") + "'"
+                           for value in values[start:start + chunk_size])
+        yield f"{scope_field} IN ({quoted})"
+
+# Geodatabase tables, through arcpy
+class ArcpyTables:
+    """
+    Reads and edits geodatabase tables with arcpy.da cursors and edit sessions, under
+    arcpy_lock. Large batches of inserts into unversioned tables are bulk loaded: the
+    rows are turned into a NumPy array, written to a table in the memory workspace
+    with NumPyArrayToTable and appended to the target in one Append, instead of being
+    sent one insertRow at a time.
+    """
+    lock = arcpy_lock
+
+    def list_fields(self, table):
+        import arcpy
+
+        return [TableField(field.name, field.type, field.length, field.aliasName) for field in arcpy.ListFields(table)]
+
+    def oid_field(self, table):
+        import arcpy
+
+        return arcpy.Describe(table).OIDFieldName
+
+    def read_rows(self, table, fields, where_clause=None):
+        import arcpy
+
+        with arcpy.da.SearchCursor(table, fields, where_clause=where_clause) as searchCursor:
+            yield from searchCursor
+
+    def edit(self, table, fields, inserts, updates, deletes, multiuser_mode):
+        import arcpy
+
+        bulk_rows = []
+        if len(inserts) >= BULK_INSERT_MINIMUM and not multiuser_mode and hasattr(arcpy.da, 'NumPyArrayToTable'):
+            bulk_rows, inserts = _split_bulk_rows(self.list_fields(table), fields, inserts)
+
+        editor = arcpy.da.Editor(os.path.dirname(table))
+        editor.startEditing(False, multiuser_mode)
+        editor.startOperation()
+        try:
+            if updates or deletes:
+                # Only visit the rows being changed
+                oid_field = self.oid_field(table)
+                for where_clause in _scope_where_clauses(oid_field, set(updates) | set(deletes)):
+                    with arcpy.da.UpdateCursor(table, ["OID@"] + fields, where_clause=where_clause) as updateCursor:
+                        for current_row in updateCursor:
+                            oid = current_row[0]
+                            if oid in deletes:
+                                updateCursor.deleteRow()
+                            elif oid in updates:
+                                updateCursor.updateRow([oid] + list(updates[oid]))
+            if inserts:
+                with arcpy.da.InsertCursor(table, fields) as insertCursor:
+                    for row in inserts:
+                        insertCursor.insertRow(row)
+            editor.stopOperation()
+            editor.stopEditing(True)
+        except Exception:
+            editor.abortOperation()
+            editor.stopEditing(False)
+            raise
+        if bulk_rows:
+            self._bulk_append(table, fields, bulk_rows)
+
+    def _bulk_append(self, table, fields, rows):
+        """Appends rows to table from an array, staged in the memory workspace."""
+        import arcpy
+        import numpy
+
+        field_types = {field.name: field for field in self.list_fields(table)}
+        array = numpy.array([tuple(row) for row in rows],
+                            dtype=[(name, _NUMPY_TYPES[field_types[name].type](field_types[name])) for name in fields])
+        staging_table = "memory/inventory_bulk_load"
+        with metrics.timer('table_bulk_load', table=os.path.basename(table)):
+            if arcpy.Exists(staging_table):
+                arcpy.management.Delete(staging_table)
+            arcpy.da.NumPyArrayToTable(array, staging_table)
+            try:
+                arcpy.management.Append(staging_table, table, "NO_TEST")
+            finally:
+                arcpy.management.Delete(staging_table)
+        metrics.count('table_bulk_rows', len(rows), table=os.path.basename(table))
+
+# NumPy types of the field types that can be bulk loaded
+_NUMPY_TYPES = {
+    'String': lambda field: f"<U{max(field.length or 1, 1)}",
+    'SmallInteger': lambda field: '<i2',
+    'Integer': lambda field: '<i4',
+    'Single': lambda field: '<f4',
+    'Double': lambda field: '<f8',
+    'Date': lambda field: '<M8[us]',
+}
+
+def _split_bulk_rows(table_fields, fields, rows):
+    """
+    Splits rows into (rows that can go through an array, the rest). NumPy arrays have no
+    nulls and silently cut long strings, so rows with a null or a string longer than its
+    field are left to the insert cursor, which stores the one and rejects the other.
+    """
+    field_types = {field.name: field for field in table_fields}
+    if any(name not in field_types or field_types[name].type not in _NUMPY_TYPES for name in fields):
+        return [], rows
+    lengths = [field_types[name].length if field_types[name].type == 'String' else None for name in fields]
+    bulk_rows, cursor_rows = [], []
+    for row in rows:
+        loadable = all(value is not None and (length is None or len(str(value)) <= length)
+                       for value, length in zip(row, lengths))
+        (bulk_rows if loadable else cursor_rows).append(row)
+    return bulk_rows, cursor_rows
+
+# Local SQLite tables, through sqlite3
+class SQLiteTables:
+    """
+    Reads and edits tables in a SQLite database with Python's sqlite3, for a local copy of
+    the inventory that needs no geodatabase connection or arcpy licence. A table path is
+    the database file followed by the table name (C:/Inventory/Inventory.sqlite/AGOInventory),
+    and the tables are created by create_sqlite_tables with the schema of
+    EnterpriseInventorySchema.gdb.zip. Each batch of edits is one transaction, and inserts
+    are loaded with executemany.
+    """
+    lock = threading.RLock()
+
+    @staticmethod
+    def _connect(table):
+        database, table_name = os.path.split(table)
+        return sqlite3.connect(database, timeout=60), table_name
+
+    def list_fields(self, table):
+        connection, table_name = self._connect(table)
+        try:
+            fields = connection.execute("SELECT field_name, field_type, length, alias FROM inventory_fields "
+                                        "WHERE table_name = ? ORDER BY position", (table_name,)).fetchall()
+        finally:
+            connection.close()
+        return [TableField(name, field_type, length, alias or name) for name, field_type, length, alias in fields]
+
+    def oid_field(self, table):
+        return 'OBJECTID'
+
+    def read_rows(self, table, fields, where_clause=None):
+        date_fields = {field.name for field in self.list_fields(table) if field.type == 'Date'}
+        date_indexes = [i for i, name in enumerate(fields) if name in date_fields]
+        columns = ", ".join('OBJECTID' if name == 'OID@' else f'"{name}"' for name in fields)
+        connection, table_name = self._connect(table)
+        try:
+            query = f'SELECT {columns} FROM "{table_name}"' + (f" WHERE {where_clause}" if where_clause else "")
+            for row in connection.execute(query):
+                if date_indexes:
+                    row = list(row)
+                    for i in date_indexes:
+                        row[i] = None if row[i] is None else datetime.fromisoformat(row[i])
+                yield tuple(row)
+        finally:
+            connection.close()
+
+    def edit(self, table, fields, inserts, updates, deletes, multiuser_mode):
+        connection, table_name = self._connect(table)
+        columns = ", ".join(f'"{name}"' for name in fields)
+        try:
+            with connection:
+                if deletes:
+                    connection.executemany(f'DELETE FROM "{table_name}" WHERE OBJECTID = ?', [(oid,) for oid in deletes])
+                if updates:
+                    assignments = ", ".join(f'"{name}" = ?' for name in fields)
+                    connection.executemany(f'UPDATE "{table_name}" SET {assignments} WHERE OBJECTID = ?',
+                                           [tuple(row) + (oid,) for oid, row in updates.items()])
+                if inserts:
+                    connection.executemany(f'INSERT INTO "{table_name}" ({columns}) VALUES ({", ".join("?" * len(fields))})',
+                                           [tuple(row) for row in inserts])
+        finally:
+            connection.close()
+
+_SQLITE_TYPES = {'String': 'VARCHAR', 'SmallInteger': 'SMALLINT', 'Integer': 'INTEGER', 'Single': 'REAL',
+                 'Double': 'DOUBLE', 'Date': 'TIMESTAMP'}
+
+def create_sqlite_tables(tables):
+    """
+    Creates the SQLite inventory tables that do not exist yet. tables maps the web
+    application's table IDs (see schema.INVENTORY_SCHEMA) to table paths; paths that are
+    not in a SQLite database are skipped. Text fields are limited to their schema length
+    the way the geodatabase limits them, and field types, lengths and aliases are recorded
+    in an inventory_fields table for list_table_fields.
+    """
+    for table_id, table in tables.items():
+        if not table or not _is_sqlite_table(table):
+            continue
+        os.makedirs(os.path.dirname(os.path.dirname(table)) or ".", exist_ok=True)
+        connection, table_name = SQLiteTables._connect(table)
+        try:
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS inventory_fields (table_name TEXT, field_name TEXT, "
+                                   "field_type TEXT, length INTEGER, alias TEXT, position INTEGER, "
+                                   "PRIMARY KEY (table_name, field_name))")
+                if connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone():
+                    continue
+                fields = [('OBJECTID', 'OID', None, None)] + INVENTORY_SCHEMA[table_id]
+                columns = ['OBJECTID INTEGER PRIMARY KEY AUTOINCREMENT'] + [
+                    f'"{name}" {_SQLITE_TYPES[field_type]}' + (f'({length}) CHECK (length("{name}") <= {length})' if length else "")
+                    for name, field_type, length, alias in fields[1:]]
+                connection.execute(f'CREATE TABLE "{table_name}" ({", ".join(columns)})')
+                connection.executemany("INSERT OR REPLACE INTO inventory_fields VALUES (?, ?, ?, ?, ?, ?)",
+                                       [(table_name, name, field_type, length, alias, position)
+                                        for position, (name, field_type, length, alias) in enumerate(fields)])
+        finally:
+            connection.close()
+
+def _is_sqlite_table(table):
+    return os.path.splitext(os.path.dirname(table))[1].lower() in SQLITE_EXTENSIONS
+
+_ARCPY_TABLES = ArcpyTables()
+_SQLITE_TABLES = SQLiteTables()
+
+def table_backend(table):
+    """The backend that reads and writes table: SQLiteTables for tables in a SQLite database, otherwise ArcpyTables."""
+    return _SQLITE_TABLES if _is_sqlite_table(table) else _ARCPY_TABLES
+
+def list_table_fields(table):
+    """The fields of an inventory table as TableField tuples (name, type, length, aliasName)."""
+    backend = table_backend(table)
+    with backend.lock:
+        return backend.list_fields(table)
+
+def read_table_rows(table, fields, where_clause=None):
+    """
+    Yields the rows of an inventory table as tuples of fields ("OID@" for the OID), holding
+    the backend's lock until the rows are exhausted or the generator is closed.
+    """
+    backend = table_backend(table)
+    with backend.lock, metrics.timer('table_read', table=os.path.basename(table)):
+        yield from backend.read_rows(table, fields, where_clause)
+
+def _edit_table(table, fields, inserts, updates, deletes, multiuser_mode):
+    """Applies one batch of inserts, updates (OID -> row) and deletes (OIDs) in a single edit session or transaction."""
+    backend = table_backend(table)
+    with backend.lock, metrics.timer('table_edit', table=os.path.basename(table)):
+        backend.edit(table, fields, inserts, updates, deletes, multiuser_mode)
+
+def apply_table_delta(table, fields, key_fields, rows, multiuser_mode=False, scope_field=None, scope_values=None,
+                      keep_field=None, keep_values=None, batch_size=WRITE_BATCH_SIZE):
+    """
+    Brings an inventory table in line with newly collected rows without rewriting it.
+    The current contents are read once and matched to the new rows on key_fields;
+    rows with duplicate keys are paired in order of occurrence. Only rows that are new,
+    different or gone are inserted, updated or deleted, so the table is never left
+    empty and a failure rolls back the batch in progress.
+
+    rows may be any iterable, including a generator that is still collecting. Only the
+    key and a hash of each current row are held in memory, and pending inserts and
+    updates are flushed in their own edit session every batch_size rows. Rows that
+    disappeared are deleted once the stream is exhausted.
+
+    When scope_field and scope_values are given, only the table rows whose scope_field
+    is one of scope_values are read and reconciled, and rows holds their replacements;
+    the rest of the table is left untouched.
+
+    When keep_field and keep_values are given, table rows whose keep_field is one of
+    keep_values are still matched and updated but never deleted, for sources that could
+    not be collected this run.
+
+    Tables are read and written through table_backend. For geodatabase tables, a batch
+    with BULK_INSERT_MINIMUM inserts or more is bulk loaded (see ArcpyTables) right after
+    its edit session, so a failed bulk load keeps that batch's updates.
+
+    multiuser_mode should be True only if the inventory tables are registered as versioned.
+    Returns the number of rows inserted, updated, deleted and left unchanged, which
+    are also counted in the run metrics.
+    """
+    key_indexes = [fields.index(field) for field in key_fields]
+
+    where_clauses = list(_scope_where_clauses(scope_field, scope_values)) if scope_field else [None]
+
+    keep_index = fields.index(keep_field) if keep_field else None
+    keep_values = {normalize_value(value) for value in keep_values or ()}
+
+    # Current table contents as key -> (OID, row hash), grouped by key
+    current = {}
+    kept = set()
+    for where_clause in where_clauses:
+        for oid, *values in read_table_rows(table, ["OID@"] + fields, where_clause):
+            normalized = tuple(normalize_value(value) for value in values)
+            key = tuple(normalized[i] for i in key_indexes)
+            current.setdefault(key, deque()).append((oid, hash(normalized)))
+            if keep_index is not None and normalized[keep_index] in keep_values:
+                kept.add(oid)
+
+    counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    inserts = []
+    updates = {}
+
+    def _flush():
+        if inserts or updates:
+            _edit_table(table, fields, inserts, updates, (), multiuser_mode)
+            counts['inserted'] += len(inserts)
+            counts['updated'] += len(updates)
+            inserts.clear()
+            updates.clear()
+
+    for row in rows:
+        normalized = tuple(normalize_value(value) for value in row)
+        key = tuple(normalized[i] for i in key_indexes)
+        matches = current.get(key)
+        if matches:
+            oid, row_hash = matches.popleft()
+            if not matches:
+                del current[key]
+            if row_hash == hash(normalized):
+                counts['unchanged'] += 1
+            else:
+                updates[oid] = row
+        else:
+            inserts.append(row)
+        if len(inserts) + len(updates) >= batch_size:
+            _flush()
+    _flush()
+
+    deletes = [oid for matches in current.values() for oid, row_hash in matches if oid not in kept]
+    for start in range(0, len(deletes), batch_size):
+        _edit_table(table, fields, (), {}, set(deletes[start:start + batch_size]), multiuser_mode)
+    counts['deleted'] = len(deletes)
+    for action, value in counts.items():
+        metrics.count('table_rows', value, table=os.path.basename(table), action=action)
+
+    print(f"  {os.path.basename(table)}: {counts['inserted']} inserted, {counts['updated']} updated, "
+          f"{counts['deleted']} deleted, {counts['unchanged']} unchanged.")
+    return counts
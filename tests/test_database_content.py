@@ -0,0 +1,41 @@
+"""Reconciles the database content table with geodatabase catalogs, in a SQLite inventory table."""
+
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from enterprise_inventory.geodatabase import _apply_database_content
+from enterprise_inventory.writer import create_sqlite_tables, read_table_rows
+
+def _catalog(database, datasets, error=None):
+    """A catalog as BuildGeodatabaseCatalog returns it for one database, holding datasets at its root."""
+    return {'database': database, 'connection': f"C:/SDEFiles/{database}", 'serverName': "GISSQL", 'error': error,
+            'entries': [(None, None, name, 'FeatureClass', 'Point', f"C:/SDEFiles/{database}/{name}", ()) for name in datasets]}
+
+class DatabaseContentTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.table = os.path.join(directory.name, 'Inventory.sqlite', 'DatabaseContent')
+        create_sqlite_tables({'DATABASE_CONTENT': self.table})
+        _apply_database_content(self.table, ['Current.sde', 'Old.sde'],
+                                {'Current.sde': _catalog('Current.sde', ['GIS.SDE.Wells', 'GIS.SDE.Roads']),
+                                 'Old.sde': _catalog('Old.sde', ['GIS.SDE.Parcels'])})
+
+    def _rows_by_database(self):
+        return Counter(database for database, in read_table_rows(self.table, ['databaseRoot']))
+
+    def test_removed_database_loses_its_rows(self):
+        _apply_database_content(self.table, ['Current.sde'], {'Current.sde': _catalog('Current.sde', ['GIS.SDE.Wells'])})
+        self.assertEqual(self._rows_by_database(), {'Current.sde': 2})
+
+    def test_failed_walk_keeps_the_database_rows(self):
+        counts = _apply_database_content(self.table, ['Current.sde', 'Old.sde'],
+                                         {'Current.sde': _catalog('Current.sde', ['GIS.SDE.Wells', 'GIS.SDE.Roads']),
+                                          'Old.sde': _catalog('Old.sde', [], error="connection lost")})
+        self.assertEqual(self._rows_by_database(), {'Current.sde': 3, 'Old.sde': 2})
+        self.assertEqual(counts['deleted'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Serves the snapshot files through the data server, with the token check accepting one token."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from enterprise_inventory.dataserver import _DataRequestHandler, published_files
+from enterprise_inventory.snapshot import search_index_file, snapshot_manifest_file
+
+class _AcceptGood:
+    def accepts(self, token, referer):
+        return token == 'good'
+
+class DataServerTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.snapshot_file = os.path.join(directory.name, 'InventorySnapshot.json.gz')
+        self._publish(b'snapshot version 1', 'hash1')
+
+        handler = type('Handler', (_DataRequestHandler,), {
+            'files': published_files(self.snapshot_file, None),
+            'manifest_path': snapshot_manifest_file(self.snapshot_file),
+            'token_checker': _AcceptGood(),
+            'log_message': lambda self, format, *args: None})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f"http://127.0.0.1:{server.server_port}/EnterpriseInventory/data/"
+
+    def _publish(self, content, content_hash):
+        with open(self.snapshot_file, 'wb') as f:
+            f.write(content)
+        with open(search_index_file(self.snapshot_file), 'wb') as f:
+            f.write(b'search index')
+        manifest = {'format': 1, 'hash': content_hash, 'file': os.path.basename(self.snapshot_file),
+                    'fileHash': hashlib.sha256(content).hexdigest(),
+                    'searchIndex': {'file': os.path.basename(search_index_file(self.snapshot_file)), 'hash': 'searchhash'}}
+        with open(snapshot_manifest_file(self.snapshot_file), 'w') as f:
+            json.dump(manifest, f)
+
+    def _get(self, name, token='good'):
+        headers = {'X-Esri-Authorization': f"Bearer {token}"} if token else {}
+        try:
+            with urlopen(Request(self.base_url + name, headers=headers)) as response:
+                return response.status, response.headers, response.read()
+        except HTTPError as e:
+            return e.code, e.headers, b''
+
+    def test_requests_need_an_accepted_token(self):
+        self.assertEqual(self._get('InventorySnapshot.manifest.json', token=None)[0], 401)
+        self.assertEqual(self._get('InventorySnapshot.manifest.json', token='bad')[0], 403)
+        self.assertEqual(self._get('RelationshipIndex.json')[0], 404)
+
+    def test_current_version_is_cached_across_tokens(self):
+        status, headers, content = self._get('InventorySnapshot.json.gz?v=hash1')
+        self.assertEqual((status, content), (200, b'snapshot version 1'))
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertIsNone(headers['Vary'])
+
+    def test_other_versions_are_not_served(self):
+        self.assertEqual(self._get('InventorySnapshot.json.gz?v=hash0')[0], 404)
+        # Rewritten after the manifest was: the bytes are not the ones listed
+        with open(self.snapshot_file, 'wb') as f:
+            f.write(b'snapshot version 2')
+        status, headers, content = self._get('InventorySnapshot.json.gz?v=hash1')
+        self.assertEqual(status, 404)
+        self.assertEqual(headers['Cache-Control'], 'no-store')
+
+    def test_manifest_is_revalidated(self):
+        status, headers, content = self._get('InventorySnapshot.manifest.json')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Cache-Control'], 'private, no-cache')
+        self.assertEqual(json.loads(content)['hash'], 'hash1')
+
+if __name__ == '__main__':
+    unittest.main()
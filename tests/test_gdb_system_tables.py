@@ -0,0 +1,101 @@
+"""Reads domains and domain usage from a SQLite copy of the geodatabase system tables."""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+
+from enterprise_inventory.geodatabase import GetDomainData, _collect_database_domains_from_system_tables
+from enterprise_inventory.writer import create_sqlite_tables, read_table_rows
+
+_XMLNS = 'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:typens="http://www.esri.com/schemas/ArcGIS/10.1"'
+
+# GDB_ITEMTYPES.UUID by item type name
+ITEM_TYPES = {
+    'Coded Value Domain': '{8C368B12-A12E-4C7E-9638-C9C64E69E98F}',
+    'Range Domain': '{C29DA988-8C3E-45F7-8B5C-18E51EE7BEB4}',
+    'Feature Class': '{70737809-852C-4A03-9E22-2CECEA5B9BFA}',
+    'Feature Dataset': '{74737149-DCB5-4257-8904-B9724E32A530}',
+    'Table': '{CD06BC3B-789D-4C51-AAFA-A467912B8965}',
+    'Workspace': '{C673FE0F-7280-404F-8532-20755DD8FC06}',
+}
+
+def _coded_value_domain(field_type, coded_values):
+    values = "".join(f'<CodedValue xsi:type="typens:CodedValue"><Name>{name}</Name><Code>{code}</Code></CodedValue>'
+                     for code, name in coded_values)
+    return (f'<GPCodedValueDomain2 xsi:type="typens:GPCodedValueDomain2" {_XMLNS}><FieldType>{field_type}</FieldType>'
+            f'<CodedValues xsi:type="typens:ArrayOfCodedValue">{values}</CodedValues></GPCodedValueDomain2>')
+
+def _dataset(element, field_domains):
+    fields = "".join(f'<GPFieldInfoEx xsi:type="typens:GPFieldInfoEx"><Name>{name}</Name>'
+                     + (f'<DomainName>{domain}</DomainName>' if domain else '') + '</GPFieldInfoEx>'
+                     for name, domain in field_domains)
+    return f'<{element} xsi:type="typens:{element}" {_XMLNS}><GPFieldInfoExs xsi:type="typens:ArrayOfGPFieldInfoEx">{fields}</GPFieldInfoExs></{element}>'
+
+# GDB_ITEMS rows as (Name, Path, type name, Definition)
+ITEMS = [
+    ('Status', '', 'Coded Value Domain', _coded_value_domain('esriFieldTypeSmallInteger', [(1, 'Active'), (2, 'Retired')])),
+    ('Owner', '', 'Coded Value Domain', _coded_value_domain('esriFieldTypeString', [('VDH', 'Health Department')])),
+    ('Depth', '', 'Range Domain', '<GPRangeDomain2 xsi:type="typens:GPRangeDomain2" ' + _XMLNS + '><FieldType>esriFieldTypeDouble</FieldType></GPRangeDomain2>'),
+    ('GIS.SDE.Wells', '\\GIS.SDE.Wells', 'Feature Class', _dataset('DEFeatureClassInfo', [('OBJECTID', None), ('STATUS', 'Status'), ('DEPTH', 'Depth')])),
+    ('GIS.SDE.Water', '\\GIS.SDE.Water', 'Feature Dataset', None),
+    ('GIS.SDE.Hydrants', '\\GIS.SDE.Water\\GIS.SDE.Hydrants', 'Feature Class', _dataset('DEFeatureClassInfo', [('OWNER', 'Owner')])),
+    ('GIS.SDE.Inspections', '\\GIS.SDE.Inspections', 'Table', _dataset('DETableInfo', [('STATUS', 'Status')])),
+    ('', '\\', 'Workspace', '<DEWorkspace/>'),
+]
+
+EXPECTED_DOMAIN_ROWS = [
+    ('CodedValue', 'Fixture.sqlite', 'Status', 1, 'Active'),
+    ('CodedValue', 'Fixture.sqlite', 'Status', 2, 'Retired'),
+    ('CodedValue', 'Fixture.sqlite', 'Owner', 'VDH', 'Health Department'),
+    ('Range', 'Fixture.sqlite', 'Depth', None, None),
+]
+EXPECTED_DOMAIN_USAGE_ROWS = [
+    ('Fixture.sqlite', 'GIS.SDE.Wells', 'STATUS', 'Status'),
+    ('Fixture.sqlite', 'GIS.SDE.Wells', 'DEPTH', 'Depth'),
+    ('Fixture.sqlite', 'GIS.SDE.Water/Hydrants', 'OWNER', 'Owner'),
+    ('Fixture.sqlite', 'GIS.SDE.Inspections', 'STATUS', 'Status'),
+]
+
+def create_system_tables(database_path):
+    """Writes a SQLite copy of the GDB_ITEMS and GDB_ITEMTYPES system tables holding ITEMS."""
+    with closing(sqlite3.connect(database_path)) as connection, connection:
+        connection.execute("CREATE TABLE GDB_ITEMTYPES (UUID TEXT PRIMARY KEY, Name TEXT)")
+        connection.execute("CREATE TABLE GDB_ITEMS (UUID TEXT, Type TEXT, Name TEXT, Path TEXT, Definition TEXT)")
+        connection.executemany("INSERT INTO GDB_ITEMTYPES VALUES (?, ?)", [(uuid, name) for name, uuid in ITEM_TYPES.items()])
+        connection.executemany("INSERT INTO GDB_ITEMS VALUES (?, ?, ?, ?, ?)",
+                               [(f"{{item-{i}}}", ITEM_TYPES[item_type], name, path, definition)
+                                for i, (name, path, item_type, definition) in enumerate(ITEMS)])
+
+class GdbSystemTableTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        create_system_tables(os.path.join(self.directory, 'Fixture.sqlite'))
+
+    def test_reads_domains_and_domain_usage(self):
+        domain_rows, domain_usage_rows = _collect_database_domains_from_system_tables(self.directory, 'Fixture.sqlite')
+        self.assertEqual(domain_rows, EXPECTED_DOMAIN_ROWS)
+        self.assertEqual(domain_usage_rows, EXPECTED_DOMAIN_USAGE_ROWS)
+
+    def test_unreadable_system_tables_return_none(self):
+        # The fixture has no dbo schema, so the query fails
+        self.assertIsNone(_collect_database_domains_from_system_tables(self.directory, 'Fixture.sqlite',
+                                                                       {'Fixture.sqlite': ('dbo', 'sqlite')}))
+
+    def test_domain_tables_are_written(self):
+        inventory = os.path.join(self.directory, 'Inventory.sqlite')
+        tables = {'DOMAIN_TABLE': f"{inventory}/Domains", 'DOMAIN_USAGE': f"{inventory}/DomainUsage"}
+        create_sqlite_tables(tables)
+        for run in range(2):
+            GetDomainData(tables['DOMAIN_TABLE'], self.directory, tables['DOMAIN_USAGE'], ['Fixture.sqlite'], useSystemTables=True)
+
+        domain_rows = list(read_table_rows(tables['DOMAIN_TABLE'], ['DomainType', 'DatabaseName', 'DomainName', 'Code', 'Description']))
+        domain_usage_rows = list(read_table_rows(tables['DOMAIN_USAGE'], ['DatabaseName', 'TableName', 'FieldName', 'DomainName']))
+        self.assertEqual(domain_rows, [tuple(None if value is None else str(value) for value in row) for row in EXPECTED_DOMAIN_ROWS])
+        self.assertEqual(domain_usage_rows, EXPECTED_DOMAIN_USAGE_ROWS)
+
+if __name__ == '__main__':
+    unittest.main()
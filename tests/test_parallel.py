@@ -0,0 +1,41 @@
+"""Chains generators running on their own threads with chain_concurrently."""
+
+import threading
+import unittest
+
+from enterprise_inventory.parallel import chain_concurrently
+
+class ChainConcurrentlyTests(unittest.TestCase):
+    def test_items_come_in_generator_order(self):
+        chained = chain_concurrently([lambda: iter(range(3)), lambda: iter(range(10, 13))], buffer_size=1)
+        self.assertEqual(list(chained), [0, 1, 2, 10, 11, 12])
+
+    def test_producer_exception_reaches_the_consumer(self):
+        def failing_site():
+            yield 'first row'
+            raise ConnectionError("site down")
+
+        chained = chain_concurrently([lambda: iter(['a', 'b']), failing_site, lambda: iter(['c'])])
+        received = []
+        with self.assertRaisesRegex(ConnectionError, "site down"):
+            for item in chained:
+                received.append(item)
+        self.assertEqual(received, ['a', 'b', 'first row'])
+
+    def test_producers_stop_when_the_consumer_stops(self):
+        stopped = threading.Event()
+
+        def endless():
+            try:
+                while True:
+                    yield 'row'
+            finally:
+                stopped.set()
+
+        chained = chain_concurrently([endless], buffer_size=1)
+        self.assertEqual(next(chained), 'row')
+        chained.close()
+        self.assertTrue(stopped.wait(5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Selects and orders stages in RunStages."""
+
+import unittest
+
+from enterprise_inventory.scheduler import RunStages
+
+class RunStagesTests(unittest.TestCase):
+    def setUp(self):
+        self.ran = []
+
+        def stage(name, dependencies=(), follows=()):
+            return (f"Running {name}...", dependencies, follows, lambda results: self.ran.append(name))
+
+        self.stages = {
+            'ago': stage('ago'),
+            'ags': stage('ags'),
+            'catalog': stage('catalog'),
+            'content': stage('content', ('catalog',)),
+            'snapshot': stage('snapshot', follows=('ago', 'ags', 'content')),
+        }
+
+    def test_followed_stages_are_not_pulled_in(self):
+        RunStages(self.stages, ['snapshot'], concurrent=False)
+        self.assertEqual(self.ran, ['snapshot'])
+
+    def test_stage_that_writes_a_table_brings_its_followers(self):
+        RunStages(self.stages, ['ags'], concurrent=False)
+        self.assertEqual(self.ran, ['ags', 'snapshot'])
+
+    def test_followers_run_after_the_stages_they_follow(self):
+        report = RunStages(self.stages, ['content', 'ago'])
+        self.assertEqual(self.ran[-1], 'snapshot')
+        self.assertEqual(sorted(self.ran), ['ago', 'catalog', 'content', 'snapshot'])
+        self.assertEqual({status for status, seconds, error in report.values()}, {'succeeded'})
+
+    def test_followers_run_after_a_failed_stage(self):
+        def fail(results):
+            raise RuntimeError("site down")
+        self.stages['ags'] = self.stages['ags'][:-1] + (fail,)
+        report = RunStages(self.stages, ['ags'], concurrent=False)
+        self.assertEqual(report['ags'][0], 'failed')
+        self.assertEqual(self.ran, ['snapshot'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Exports a SQLite inventory table to a snapshot streamed a slice of a column at a time."""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from enterprise_inventory import snapshot
+from enterprise_inventory.snapshot import ExportInventorySnapshot
+from enterprise_inventory.writer import apply_table_delta, create_sqlite_tables
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tables = {'AGO_DATA': os.path.join(directory.name, 'Inventory.sqlite', 'AGOInventory'), 'PBI_DATA': None}
+        self.snapshot_file = os.path.join(directory.name, 'state', 'InventorySnapshot.json.gz')
+        create_sqlite_tables(self.tables)
+        apply_table_delta(self.tables['AGO_DATA'], ['ItemID', 'ItemName'], ['ItemID'],
+                          [(f"item{i}", "Roads" if i % 2 else "Parcels ñ") for i in range(5)])
+        # Several slices per column
+        patch = mock.patch.object(snapshot, 'JSON_SLICE_LENGTH', 2)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _read_snapshot(self):
+        with gzip.open(self.snapshot_file, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_streamed_snapshot_decodes_to_the_table(self):
+        manifest = ExportInventorySnapshot(self.tables, self.snapshot_file)
+        content = self._read_snapshot()
+        table = content['tables']['AGO_DATA']
+        names = [field['name'] for field in table['fields']]
+        item_names = table['columns'][names.index('ItemName')]
+        self.assertEqual(item_names['encoding'], 'dictionary')
+        self.assertEqual([content['dictionary'][value] for value in item_names['values']],
+                         ["Parcels ñ", "Roads", "Parcels ñ", "Roads", "Parcels ñ"])
+        self.assertEqual(table['columns'][names.index('OBJECTID')]['values'], [1, 2, 3, 4, 5])
+        self.assertEqual(manifest['tables'], {'AGO_DATA': 5})
+
+        # The hash is the one json.dumps of the content would give
+        expected = json.dumps({'dictionary': content['dictionary'], 'tables': content['tables']},
+                              separators=(',', ':'), ensure_ascii=False)
+        self.assertEqual(content['hash'], hashlib.sha256(expected.encode('utf-8')).hexdigest())
+        self.assertEqual(content['hash'], manifest['hash'])
+
+    def test_unchanged_tables_keep_the_version(self):
+        first = ExportInventorySnapshot(self.tables, self.snapshot_file)
+        second = ExportInventorySnapshot(self.tables, self.snapshot_file)
+        self.assertEqual(second['version'], first['version'])
+        self.assertFalse(os.path.exists(f"{self.snapshot_file}.tmp"))
+
+if __name__ == '__main__':
+    unittest.main()